@@ -0,0 +1,7 @@
+import os
+
+# Third-party provider base URLs. Override these to point the app at the local
+# stand-in servers in src/tools/provider_standin.py for offline load testing.
+SENDGRID_API_BASE = os.environ.get('SENDGRID_API_BASE', 'https://api.sendgrid.com').rstrip('/')
+HUBSPOT_API_BASE = os.environ.get('HUBSPOT_API_BASE', 'https://api.hubapi.com').rstrip('/')
+STRIPE_API_BASE = os.environ.get('STRIPE_API_BASE', 'https://api.stripe.com').rstrip('/')
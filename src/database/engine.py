@@ -0,0 +1,108 @@
+import os
+import sqlite3
+
+from sqlalchemy import event, inspect, literal, text
+from src.models.user import db
+
+DEFAULT_SQLITE_PATH = os.path.join(os.path.dirname(__file__), 'app.db')
+
+# SQLite, applied to every new connection
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+# Server databases (DATABASE_URL)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT_SECONDS = int(os.environ.get('DB_POOL_TIMEOUT_SECONDS', 30))
+DB_POOL_RECYCLE_SECONDS = int(os.environ.get('DB_POOL_RECYCLE_SECONDS', 1800))
+
+
+def database_uri():
+    """
+    DATABASE_URL if set, otherwise the bundled SQLite file. postgresql:// URLs use
+    psycopg2 (psycopg2-binary in requirements.txt).
+    """
+    url = os.environ.get('DATABASE_URL')
+    if not url:
+        return f"sqlite:///{DEFAULT_SQLITE_PATH}"
+    if url.startswith('postgres://'):
+        # Heroku-style URLs; SQLAlchemy only knows the postgresql:// scheme
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(uri):
+    if uri.startswith('sqlite'):
+        # pysqlite's own lock wait, kept in step with PRAGMA busy_timeout
+        return {'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT_SECONDS,
+        'pool_recycle': DB_POOL_RECYCLE_SECONDS,
+        'pool_pre_ping': True,
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    WAL lets readers and a writer run at the same time, and with synchronous=NORMAL a
+    commit no longer waits for an fsync. busy_timeout makes a second writer wait for
+    the lock instead of failing with "database is locked".
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}')
+    cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}')
+    cursor.close()
+
+
+def install_sqlite_pragmas(engine):
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', _set_sqlite_pragmas)
+
+
+def configure(app, uri=None):
+    """Point db at DATABASE_URL (or the SQLite file) with tuned engine options"""
+    uri = uri or database_uri()
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(uri)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(db.engine)
+
+
+def _column_ddl(column, dialect):
+    ddl = f'"{column.name}" {column.type.compile(dialect=dialect)}'
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        ddl += f" DEFAULT {literal(default, column.type).compile(dialect=dialect, compile_kwargs={'literal_binds': True})}"
+    if not column.nullable and default is not None:
+        ddl += ' NOT NULL'
+    return ddl
+
+
+def ensure_schema():
+    """
+    create_all() plus ALTER TABLE ... ADD COLUMN for columns added to a model after its
+    table was created, which create_all() leaves alone. Call inside an app context.
+    """
+    db.create_all()
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        missing = [column for column in table.columns if column.name not in existing]
+        for column in missing:
+            if not column.nullable and (column.default is None or not column.default.is_scalar):
+                print(f"❌ Cannot add {table.name}.{column.name}: NOT NULL without a scalar default")
+                continue
+            db.session.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN {_column_ddl(column, db.engine.dialect)}'))
+            print(f"✅ Added column {table.name}.{column.name}")
+        db.session.commit()
+        if missing:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
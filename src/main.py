@@ -1,14 +1,24 @@
 import os
 import sys
+import threading
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, send_from_directory
 from flask_cors import CORS
-from src.models.user import db
 from src.routes.user import user_bp
 from src.routes.roi_calculator import roi_bp
 from src.routes.payment import payment_bp
+from src.routes.billing import billing_bp
+from src.routes.metrics import metrics_bp
+from src.routes.analytics import analytics_bp
+from src.services import webhook_events
+from src.services import stripe_client
+from src.services import user_cache
+from src.services import lead_quantiles
+from src.services import store_index
+from src.services import rate_limiter
+from src.database import engine
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -19,13 +29,32 @@ CORS(app, origins='*')
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(roi_bp, url_prefix='/api')
 app.register_blueprint(payment_bp, url_prefix='/api')
+app.register_blueprint(billing_bp, url_prefix='/api')
+app.register_blueprint(metrics_bp, url_prefix='/api')
+app.register_blueprint(analytics_bp, url_prefix='/api')
 
-# uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
+# Per-IP rate limits and load shedding for /api, applied before Flask parses the request
+app.wsgi_app = rate_limiter.RateLimitMiddleware(app.wsgi_app)
+
+# DATABASE_URL, or src/database/app.db in WAL mode
+engine.configure(app)
 with app.app_context():
-    db.create_all()
+    engine.ensure_schema()
+
+# Stripe webhooks are acknowledged immediately and processed in the background
+webhook_events.start_workers(app)
+
+# Live ROI benchmark sketches, persisted periodically
+lead_quantiles.start_flusher(app)
+
+# "Stores like yours" nearest-neighbour index, rebuilt in the background
+store_index.start(app)
+
+# Cross-worker user cache invalidation, when enabled
+user_cache.start_invalidation_listener()
+
+# Open the Stripe connection now rather than on the first customer request
+threading.Thread(target=stripe_client.warm_up, name='stripe-warm-up', daemon=True).start()
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -0,0 +1,170 @@
+from datetime import datetime
+from src.models.user import db
+
+
+class StripePrice(db.Model):
+    """Local copy of the Stripe Price resolved for each lookup key"""
+    lookup_key = db.Column(db.String(120), primary_key=True)
+    price_id = db.Column(db.String(255), nullable=False)
+    unit_amount = db.Column(db.Integer, nullable=False)
+    currency = db.Column(db.String(3), nullable=False, default='usd')
+    interval = db.Column(db.String(20))
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StripePrice {self.lookup_key} {self.price_id}>'
+
+
+class StripeCustomerIndex(db.Model):
+    """Maps a normalized email address to its Stripe customer id"""
+    email = db.Column(db.String(255), primary_key=True)
+    customer_id = db.Column(db.String(255), nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StripeCustomerIndex {self.email} {self.customer_id}>'
+
+
+class StripeEvent(db.Model):
+    """Raw Stripe webhook event, stored before it is processed"""
+    id = db.Column(db.String(255), primary_key=True)  # Stripe event id, unique per delivery
+    type = db.Column(db.String(120), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    received_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime)  # when a worker moved it to processing; the start of its lease
+    processed_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<StripeEvent {self.id} {self.type} {self.status}>'
+
+
+class IdempotentResponse(db.Model):
+    """Final JSON response of a payment endpoint, stored under the client's Idempotency-Key"""
+    key = db.Column(db.String(255), primary_key=True)  # "<endpoint>:<Idempotency-Key>"
+    status_code = db.Column(db.Integer, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f'<IdempotentResponse {self.key} {self.status_code}>'
+
+
+class StripeCustomer(db.Model):
+    """Local mirror of a Stripe customer"""
+    id = db.Column(db.String(255), primary_key=True)
+    email = db.Column(db.String(255), index=True)
+    name = db.Column(db.String(255))
+    metadata_json = db.Column(db.JSON)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+    created = db.Column(db.DateTime)
+    synced_at = db.Column(db.Integer, nullable=False, default=0)  # Stripe timestamp of the data
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'email': self.email,
+            'name': self.name,
+            'metadata': self.metadata_json or {},
+            'deleted': self.deleted,
+            'created': self.created.isoformat() if self.created else None
+        }
+
+
+class StripeSubscription(db.Model):
+    """Local mirror of a Stripe subscription"""
+    id = db.Column(db.String(255), primary_key=True)
+    customer_id = db.Column(db.String(255), index=True)
+    status = db.Column(db.String(40), index=True)
+    plan = db.Column(db.String(40), index=True)
+    price_id = db.Column(db.String(255))
+    unit_amount = db.Column(db.Integer)
+    cancel_at_period_end = db.Column(db.Boolean, nullable=False, default=False)
+    current_period_end = db.Column(db.DateTime)
+    trial_end = db.Column(db.DateTime)
+    metadata_json = db.Column(db.JSON)
+    created = db.Column(db.DateTime)
+    synced_at = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'customer_id': self.customer_id,
+            'status': self.status,
+            'plan': self.plan,
+            'price_id': self.price_id,
+            'unit_amount': self.unit_amount,
+            'cancel_at_period_end': self.cancel_at_period_end,
+            'current_period_end': self.current_period_end.isoformat() if self.current_period_end else None,
+            'trial_end': self.trial_end.isoformat() if self.trial_end else None,
+            'created': self.created.isoformat() if self.created else None
+        }
+
+
+class StripePaymentIntent(db.Model):
+    """Local mirror of a Stripe payment intent"""
+    id = db.Column(db.String(255), primary_key=True)
+    customer_id = db.Column(db.String(255), index=True)
+    status = db.Column(db.String(40), index=True)
+    amount = db.Column(db.Integer)
+    currency = db.Column(db.String(3))
+    description = db.Column(db.String(255))
+    metadata_json = db.Column(db.JSON)
+    created = db.Column(db.DateTime, index=True)
+    synced_at = db.Column(db.Integer, nullable=False, default=0)
+    emails_sent_at = db.Column(db.DateTime)  # set once the payment confirmation emails are claimed
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'customer_id': self.customer_id,
+            'status': self.status,
+            'amount': self.amount,
+            'currency': self.currency,
+            'description': self.description,
+            'metadata': self.metadata_json or {},
+            'created': self.created.isoformat() if self.created else None
+        }
+
+
+class StripeInvoice(db.Model):
+    """Local mirror of a Stripe invoice"""
+    id = db.Column(db.String(255), primary_key=True)
+    customer_id = db.Column(db.String(255), index=True)
+    subscription_id = db.Column(db.String(255), index=True)
+    status = db.Column(db.String(40), index=True)
+    amount_due = db.Column(db.Integer)
+    amount_paid = db.Column(db.Integer)
+    currency = db.Column(db.String(3))
+    created = db.Column(db.DateTime, index=True)
+    synced_at = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'customer_id': self.customer_id,
+            'subscription_id': self.subscription_id,
+            'status': self.status,
+            'amount_due': self.amount_due,
+            'amount_paid': self.amount_paid,
+            'currency': self.currency,
+            'created': self.created.isoformat() if self.created else None
+        }
+
+
+class OpenCheckoutSession(db.Model):
+    """Embedded Checkout Session still open for a customer and plan, reused on page reloads"""
+    customer_id = db.Column(db.String(255), primary_key=True)
+    plan = db.Column(db.String(40), primary_key=True)
+    session_id = db.Column(db.String(255), nullable=False, unique=True)
+    client_secret = db.Column(db.String(255), nullable=False)
+    # sha256 of the session's metadata; only a request with the same details reuses it
+    metadata_hash = db.Column(db.String(64))
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<OpenCheckoutSession {self.customer_id} {self.plan} {self.session_id}>'
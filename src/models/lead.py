@@ -0,0 +1,121 @@
+from datetime import datetime
+from src.models.user import db
+
+
+class Lead(db.Model):
+    """One ROI calculator submission: parsed inputs, computed projections, score and delivery outcome"""
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(255), nullable=False, index=True)
+    first_name = db.Column(db.String(120))
+    last_name = db.Column(db.String(120))
+    company = db.Column(db.String(255))
+    phone = db.Column(db.String(60))
+    website = db.Column(db.String(255))
+
+    business_category = db.Column(db.String(80), index=True)
+    business_stage = db.Column(db.String(80))
+    hours_week_manual_tasks = db.Column(db.String(40))
+    biggest_challenges = db.Column(db.JSON)
+    monthly_revenue = db.Column(db.Float, nullable=False, default=0)
+    average_order_value = db.Column(db.Float, nullable=False, default=0)
+    monthly_orders = db.Column(db.Float, nullable=False, default=0)
+    current_conversion_rate = db.Column(db.Float, nullable=False, default=0)
+    cart_abandonment_rate = db.Column(db.Float, nullable=False, default=0)
+    monthly_ad_spend = db.Column(db.Float, nullable=False, default=0)
+
+    roi_data = db.Column(db.JSON, nullable=False)
+    lead_score = db.Column(db.Integer, nullable=False, default=0, index=True)
+
+    # Delivery state of the side effects, as reported by each sender
+    email_sent = db.Column(db.Boolean)
+    lead_notification_sent = db.Column(db.Boolean)
+    hubspot_submitted = db.Column(db.Boolean)
+
+    # Junk-submission verdict; flagged leads skip the emails, HubSpot and analytics
+    flagged_as_spam = db.Column(db.Boolean, nullable=False, default=False, index=True)
+    spam_reasons = db.Column(db.JSON)
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<Lead {self.id} {self.email}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'email': self.email,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'company': self.company,
+            'phone': self.phone,
+            'website': self.website,
+            'business_category': self.business_category,
+            'business_stage': self.business_stage,
+            'hours_week_manual_tasks': self.hours_week_manual_tasks,
+            'biggest_challenges': self.biggest_challenges or [],
+            'monthly_revenue': self.monthly_revenue,
+            'average_order_value': self.average_order_value,
+            'monthly_orders': self.monthly_orders,
+            'current_conversion_rate': self.current_conversion_rate,
+            'cart_abandonment_rate': self.cart_abandonment_rate,
+            'monthly_ad_spend': self.monthly_ad_spend,
+            'roi_data': self.roi_data,
+            'lead_score': self.lead_score,
+            'email_sent': self.email_sent,
+            'lead_notification_sent': self.lead_notification_sent,
+            'hubspot_submitted': self.hubspot_submitted,
+            'flagged_as_spam': self.flagged_as_spam,
+            'spam_reasons': self.spam_reasons or [],
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class LeadDailyRollup(db.Model):
+    """Per-day, per-category totals over stored leads, kept up to date as each lead is written"""
+    day = db.Column(db.Date, primary_key=True)
+    business_category = db.Column(db.String(80), primary_key=True)
+    submissions = db.Column(db.Integer, nullable=False, default=0)
+    monthly_revenue_sum = db.Column(db.Float, nullable=False, default=0)
+    monthly_increase_sum = db.Column(db.Float, nullable=False, default=0)
+    lead_score_sum = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat(),
+            'business_category': self.business_category,
+            'submissions': self.submissions,
+            'monthly_revenue_sum': self.monthly_revenue_sum,
+            'monthly_increase_sum': self.monthly_increase_sum,
+            'lead_score_sum': self.lead_score_sum,
+            'avg_monthly_revenue': self.monthly_revenue_sum / self.submissions if self.submissions else 0,
+            'avg_monthly_increase': self.monthly_increase_sum / self.submissions if self.submissions else 0,
+            'avg_lead_score': self.lead_score_sum / self.submissions if self.submissions else 0
+        }
+
+
+class LeadQuantileSketch(db.Model):
+    """Persisted KLL sketch of one lead metric within one business category"""
+    business_category = db.Column(db.String(80), primary_key=True)
+    metric = db.Column(db.String(60), primary_key=True)
+    state = db.Column(db.JSON, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<LeadQuantileSketch {self.business_category} {self.metric} n={self.count}>'
+
+
+class RecentSubmission(db.Model):
+    """
+    Fingerprint of a recent ROI submission and the response it got, so repeats within
+    the coalescing window are answered without redoing the side effects. A row with no
+    response yet is a submission still being processed.
+    """
+    fingerprint = db.Column(db.String(64), primary_key=True)
+    response = db.Column(db.JSON)
+    # Random token of the request processing it; only that request may complete or release the row
+    claim_token = db.Column(db.String(32))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<RecentSubmission {self.fingerprint[:12]} {"done" if self.response is not None else "in flight"}>'
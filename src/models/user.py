@@ -6,6 +6,7 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=1)  # bumped on every update; the ETag is built from it
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from flask import Blueprint, jsonify, request
+from src.models.lead import LeadDailyRollup
+from src.services import lead_quantiles
+
+analytics_bp = Blueprint('analytics', __name__)
+
+@analytics_bp.route('/analytics/roi', methods=['GET'])
+def roi_analytics():
+    """Daily ROI submission rollups by business category, read from the incrementally maintained table"""
+    days = request.args.get('days', 30, type=int)
+    category = request.args.get('category')
+    if days < 1:
+        return jsonify({'error': 'days must be at least 1'}), 400
+    since = (datetime.utcnow() - timedelta(days=days - 1)).date()
+
+    query = LeadDailyRollup.query.filter(LeadDailyRollup.day >= since)
+    if category:
+        query = query.filter_by(business_category=category)
+    rows = query.order_by(LeadDailyRollup.day, LeadDailyRollup.business_category).all()
+
+    totals = {}
+    for row in rows:
+        total = totals.setdefault(row.business_category, {
+            'submissions': 0, 'monthly_revenue_sum': 0, 'monthly_increase_sum': 0, 'lead_score_sum': 0
+        })
+        total['submissions'] += row.submissions
+        total['monthly_revenue_sum'] += row.monthly_revenue_sum
+        total['monthly_increase_sum'] += row.monthly_increase_sum
+        total['lead_score_sum'] += row.lead_score_sum
+    for total in totals.values():
+        total['avg_monthly_revenue'] = total['monthly_revenue_sum'] / total['submissions']
+        total['avg_monthly_increase'] = total['monthly_increase_sum'] / total['submissions']
+        total['avg_lead_score'] = total['lead_score_sum'] / total['submissions']
+
+    return jsonify({
+        'since': since.isoformat(),
+        'daily': [row.to_dict() for row in rows],
+        'by_category': totals
+    })
+
+@analytics_bp.route('/analytics/benchmarks', methods=['GET'])
+def roi_benchmarks():
+    """Live quartiles of submitted store metrics for a category (default: all categories)"""
+    category = request.args.get('category', lead_quantiles.ALL_CATEGORIES)
+    return jsonify({
+        'category': category,
+        'min_samples': lead_quantiles.QUANTILE_MIN_SAMPLES,
+        'metrics': lead_quantiles.summary(category)
+    })
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+from flask import Blueprint, jsonify, request
+from sqlalchemy import func
+from src.models.user import db
+from src.models.billing import StripeCustomer, StripeSubscription, StripePaymentIntent, StripeInvoice
+
+billing_bp = Blueprint('billing', __name__)
+
+@billing_bp.route('/billing/summary', methods=['GET'])
+def billing_summary():
+    """Subscription, invoice and payment totals answered from the local Stripe mirror"""
+    days = request.args.get('days', 30, type=int)
+    since = datetime.utcnow() - timedelta(days=days)
+
+    subscriptions = dict(
+        db.session.query(StripeSubscription.status, func.count())
+        .group_by(StripeSubscription.status)
+        .all()
+    )
+    monthly_recurring_cents = db.session.query(func.coalesce(func.sum(StripeSubscription.unit_amount), 0)).filter(
+        StripeSubscription.status.in_(('active', 'past_due'))
+    ).scalar()
+    invoices = dict(
+        db.session.query(StripeInvoice.status, func.count())
+        .filter(StripeInvoice.created >= since)
+        .group_by(StripeInvoice.status)
+        .all()
+    )
+    payments_count, payments_cents = db.session.query(
+        func.count(), func.coalesce(func.sum(StripePaymentIntent.amount), 0)
+    ).filter(
+        StripePaymentIntent.status == 'succeeded',
+        StripePaymentIntent.created >= since
+    ).one()
+    customers = db.session.query(func.count()).select_from(StripeCustomer).filter(
+        StripeCustomer.deleted.is_(False)
+    ).scalar()
+
+    return jsonify({
+        'customers': customers,
+        'subscriptions_by_status': subscriptions,
+        'monthly_recurring_revenue': monthly_recurring_cents / 100,
+        'period_days': days,
+        'invoices_by_status': invoices,
+        'payments_succeeded': payments_count,
+        'payments_succeeded_amount': payments_cents / 100
+    })
+
+@billing_bp.route('/billing/customers/<customer_id>', methods=['GET'])
+def billing_customer(customer_id):
+    """A customer with their subscriptions, invoices and payments from the local mirror"""
+    customer = db.get_or_404(StripeCustomer, customer_id)
+    subscriptions = StripeSubscription.query.filter_by(customer_id=customer_id).order_by(StripeSubscription.created.desc()).all()
+    invoices = StripeInvoice.query.filter_by(customer_id=customer_id).order_by(StripeInvoice.created.desc()).limit(50).all()
+    payments = StripePaymentIntent.query.filter_by(customer_id=customer_id).order_by(StripePaymentIntent.created.desc()).limit(50).all()
+    return jsonify({
+        'customer': customer.to_dict(),
+        'subscriptions': [subscription.to_dict() for subscription in subscriptions],
+        'invoices': [invoice.to_dict() for invoice in invoices],
+        'payment_intents': [payment.to_dict() for payment in payments]
+    })
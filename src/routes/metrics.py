@@ -0,0 +1,9 @@
+from flask import Blueprint, jsonify
+from src.services import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Counters, latency timers and gauges collected in this process"""
+    return jsonify(metrics.snapshot())
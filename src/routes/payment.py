@@ -3,9 +3,28 @@ import stripe
 from flask import Blueprint, request, jsonify
 from datetime import datetime
 import requests
+from src.config import SENDGRID_API_BASE, STRIPE_API_BASE
+from src.services.price_catalog import resolve_price
+from src.services.plan_catalog import get_plan
+from src.services.customer_index import resolve_customer, apply_customer_event, is_missing_customer, forget as forget_customer
+from src.services.webhook_events import record_event
+from src.services.webhook_dispatch import handles_event
+from src.services import stripe_mirror  # registers the mirror's webhook handlers
+from src.services.idempotency import idempotent, stripe_idempotency_key
+from src.services import background
+from src.services import checkout_sessions
+from src.services import stripe_client
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.billing import StripePaymentIntent
 
 # Initialize Stripe
 stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+stripe.api_base = STRIPE_API_BASE
+stripe_client.configure()  # shared keep-alive pool, timeouts and retries
+
+# Create the monthly subscription after create-payment-intent has responded
+DEFER_SUBSCRIPTION_SETUP = os.environ.get('DEFER_SUBSCRIPTION_SETUP', '').lower() in ('1', 'true', 'yes')
 
 payment_bp = Blueprint('payment', __name__)
 
@@ -18,7 +37,7 @@ def send_payment_confirmation_email(customer_email, customer_name, plan_name, am
     
     try:
         # SendGrid configuration
-        sg = sendgrid.SendGridAPIClient(api_key=os.environ.get('SENDGRID_API_KEY'))
+        sg = sendgrid.SendGridAPIClient(api_key=os.environ.get('SENDGRID_API_KEY'), host=SENDGRID_API_BASE)
         
         # Use proper payment confirmation template
         subject = f"Payment Confirmation - {plan_name}"
@@ -131,7 +150,7 @@ def send_payment_notification_email(customer_data, plan_name, amount, is_recurri
     
     try:
         # SendGrid configuration
-        sg = sendgrid.SendGridAPIClient(api_key=os.environ.get('SENDGRID_API_KEY'))
+        sg = sendgrid.SendGridAPIClient(api_key=os.environ.get('SENDGRID_API_KEY'), host=SENDGRID_API_BASE)
         
         # Use proper payment notification template
         subject = f"New Payment Received - {plan_name} - {customer_data.get('company', 'N/A')}"
@@ -239,7 +258,44 @@ Customer confirmation email has been sent automatically."""
         print(f"❌ Error sending payment notification email: {str(e)}")
         return False
 
+def setup_monthly_subscription(customer_id, plan, customer_data, idempotency_key=None):
+    """Resolve the plan's monthly price and create the trial subscription; None on failure"""
+    try:
+        # Resolve the plan's monthly price from the catalog (created once per plan)
+        price_id = resolve_price(plan.monthly_lookup_key, plan.monthly_fee_cents, plan.monthly_product_name)
+        
+        # Create subscription (will start after setup payment is confirmed)
+        return stripe.Subscription.create(
+            customer=customer_id,
+            items=[{'price': price_id}],
+            trial_end=int((datetime.now().timestamp()) + (7 * 24 * 60 * 60)),  # 7 day trial
+            metadata={
+                'plan': plan.key,
+                'plan_name': plan.name,
+                'customer_name': customer_data['name'],
+                'customer_email': customer_data['email'],
+                'company': customer_data.get('company', '')
+            },
+            idempotency_key=idempotency_key
+        )
+    except Exception as e:
+        print(f"Error creating subscription: {str(e)}")
+        # Continue without subscription if it fails
+        return None
+
+def cancel_orphaned_subscription(subscription_future):
+    """Cancel a subscription whose setup-fee payment intent could not be created"""
+    subscription = subscription_future.result()
+    if subscription is None:
+        return
+    try:
+        stripe.Subscription.cancel(subscription.id)
+        print(f"✅ Cancelled orphaned subscription {subscription.id}")
+    except Exception as e:
+        print(f"❌ Error cancelling orphaned subscription {subscription.id}: {str(e)}")
+
 @payment_bp.route('/create-payment-intent', methods=['POST'])
+@idempotent
 def create_payment_intent():
     """Create a Stripe payment intent for one-time and recurring payments"""
     try:
@@ -254,118 +310,148 @@ def create_payment_intent():
             'shopify_url': data.get('shopify_url')
         }
         
-        plan = data.get('plan', 'professional')
-        
-        # Define plan pricing
-        plans = {
-            'growth': {
-                'name': 'Growth Plan',
-                'setup_fee': 299700,  # $2,997 in cents
-                'monthly_fee': 99700,  # $997 in cents
-            },
-            'professional': {
-                'name': 'Professional Plan',
-                'setup_fee': 499700,  # $4,997 in cents
-                'monthly_fee': 149700,  # $1,497 in cents
-            },
-            'enterprise': {
-                'name': 'Enterprise Plan',
-                'setup_fee': 999700,  # $9,997 in cents
-                'monthly_fee': 299700,  # $2,997 in cents
-            }
-        }
-        
-        if plan not in plans:
+        plan = get_plan(data.get('plan'))
+        if plan is None:
             return jsonify({'error': 'Invalid plan selected'}), 400
         
-        plan_info = plans[plan]
-        
-        # Create or retrieve Stripe customer
-        try:
-            customer = stripe.Customer.create(
-                email=customer_data['email'],
-                name=customer_data['name'],
-                metadata={
-                    'company': customer_data.get('company', ''),
-                    'phone': customer_data.get('phone', ''),
-                    'shopify_url': customer_data.get('shopify_url', ''),
-                    'plan': plan
-                }
-            )
-        except Exception as e:
-            print(f"Error creating Stripe customer: {str(e)}")
-            return jsonify({'error': 'Failed to create customer'}), 500
-        
-        # Create payment intent for setup fee
-        try:
-            payment_intent = stripe.PaymentIntent.create(
-                amount=plan_info['setup_fee'],
-                currency='usd',
-                customer=customer.id,
-                metadata={
-                    'plan': plan,
-                    'plan_name': plan_info['name'],
-                    'customer_name': customer_data['name'],
-                    'customer_email': customer_data['email'],
-                    'company': customer_data.get('company', ''),
-                    'type': 'setup_fee'
-                },
-                description=f"{plan_info['name']} - Setup Fee"
-            )
-        except Exception as e:
-            print(f"Error creating payment intent: {str(e)}")
-            return jsonify({'error': 'Failed to create payment intent'}), 500
-        
-        # Create subscription for monthly recurring payments
-        try:
-            # First create a price for the monthly fee
-            price = stripe.Price.create(
-                unit_amount=plan_info['monthly_fee'],
-                currency='usd',
-                recurring={'interval': 'month'},
-                product_data={
-                    'name': f"{plan_info['name']} - Monthly Service",
-                    'description': f"Monthly service fee for {plan_info['name']}"
-                }
-            )
+        for attempt in range(2):
+            # A retry runs with a different customer, so its Stripe calls need their own keys
+            suffix = '' if attempt == 0 else ':retry'
             
-            # Create subscription (will start after setup payment is confirmed)
-            subscription = stripe.Subscription.create(
-                customer=customer.id,
-                items=[{'price': price.id}],
-                trial_end=int((datetime.now().timestamp()) + (7 * 24 * 60 * 60)),  # 7 day trial
-                metadata={
-                    'plan': plan,
-                    'plan_name': plan_info['name'],
-                    'customer_name': customer_data['name'],
-                    'customer_email': customer_data['email'],
-                    'company': customer_data.get('company', '')
-                }
+            # Create or retrieve Stripe customer (returning buyers come from the local index)
+            try:
+                customer_id, _ = resolve_customer(
+                    customer_data['email'],
+                    customer_data['name'],
+                    metadata={
+                        'company': customer_data.get('company', ''),
+                        'phone': customer_data.get('phone', ''),
+                        'shopify_url': customer_data.get('shopify_url', ''),
+                        'plan': plan.key
+                    },
+                    idempotency_key=stripe_idempotency_key('customer' + suffix)
+                )
+            except Exception as e:
+                print(f"Error creating Stripe customer: {str(e)}")
+                return jsonify({'error': 'Failed to create customer'}), 500
+            
+            # The price lookup and subscription only need the customer, so they run
+            # on the background pool while the payment intent is created here
+            subscription_future = background.submit(
+                setup_monthly_subscription,
+                customer_id,
+                plan,
+                customer_data,
+                stripe_idempotency_key('subscription' + suffix)
             )
             
-        except Exception as e:
-            print(f"Error creating subscription: {str(e)}")
-            # Continue without subscription if it fails
-            subscription = None
+            # Create payment intent for setup fee
+            try:
+                payment_intent = stripe.PaymentIntent.create(
+                    amount=plan.setup_fee_cents,
+                    currency='usd',
+                    customer=customer_id,
+                    metadata={
+                        'plan': plan.key,
+                        'plan_name': plan.name,
+                        'customer_name': customer_data['name'],
+                        'customer_email': customer_data['email'],
+                        'company': customer_data.get('company', ''),
+                        'type': 'setup_fee'
+                    },
+                    description=plan.setup_product_name,
+                    idempotency_key=stripe_idempotency_key('payment_intent' + suffix)
+                )
+                break
+            except Exception as e:
+                # Don't leave a trial subscription behind for a checkout that cannot be paid
+                subscription_future.add_done_callback(cancel_orphaned_subscription)
+                if attempt == 0 and is_missing_customer(e):
+                    print(f"❌ Indexed Stripe customer {customer_id} no longer exists, resolving again")
+                    forget_customer(customer_id)
+                    continue
+                print(f"Error creating payment intent: {str(e)}")
+                return jsonify({'error': 'Failed to create payment intent'}), 500
+        
+        # With deferred setup the subscription finishes after the response is sent
+        subscription = None if DEFER_SUBSCRIPTION_SETUP else subscription_future.result()
         
         return jsonify({
             'client_secret': payment_intent.client_secret,
-            'customer_id': customer.id,
+            'customer_id': customer_id,
             'subscription_id': subscription.id if subscription else None,
-            'plan_info': {
-                'name': plan_info['name'],
-                'setup_fee': plan_info['setup_fee'] / 100,  # Convert back to dollars
-                'monthly_fee': plan_info['monthly_fee'] / 100
-            }
+            'subscription_pending': DEFER_SUBSCRIPTION_SETUP,
+            'plan_info': dict(plan.public_info)
         })
         
     except Exception as e:
         print(f"Error in create_payment_intent: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
+def send_payment_emails_once(payment_intent_id):
+    """
+    Send the customer confirmation and admin notification for a paid intent.
+    Both the webhook and confirm-payment ask for this; the emails_sent_at claim on
+    the mirrored intent makes sure they go out only once.
+    """
+    claimed = StripePaymentIntent.query.filter_by(id=payment_intent_id, emails_sent_at=None).update(
+        {'emails_sent_at': datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    if not claimed:
+        return False
+    
+    payment_intent = db.session.get(StripePaymentIntent, payment_intent_id)
+    metadata = payment_intent.metadata_json or {}
+    customer_email = metadata.get('customer_email')
+    customer_name = metadata.get('customer_name')
+    plan_name = metadata.get('plan_name')
+    
+    if not (customer_email and customer_name and plan_name):
+        print(f"❌ Missing customer data in payment metadata")
+        return False
+    
+    amount = payment_intent.amount / 100  # Convert from cents to dollars
+    customer_data = {
+        'email': customer_email,
+        'name': customer_name,
+        'company': metadata.get('company') or 'N/A'
+    }
+    
+    customer_email_sent = False
+    notification_email_sent = False
+    try:
+        customer_email_sent = send_payment_confirmation_email(
+            customer_email,
+            customer_name,
+            plan_name,
+            amount,
+            is_recurring=True  # All plans have recurring components
+        )
+        
+        notification_email_sent = send_payment_notification_email(
+            customer_data,
+            plan_name,
+            amount,
+            is_recurring=True
+        )
+        
+        print(f"✅ Payment emails sent - Customer: {customer_email_sent}, Admin: {notification_email_sent}")
+        
+    except Exception as e:
+        print(f"❌ Error sending payment emails: {str(e)}")
+    
+    if not customer_email_sent and not notification_email_sent:
+        # Nothing went out; release the claim so the next attempt can retry
+        payment_intent.emails_sent_at = None
+        db.session.commit()
+        return False
+    return True
+
 @payment_bp.route('/confirm-payment', methods=['POST'])
 def confirm_payment():
-    """Confirm payment and send confirmation emails"""
+    """Confirm payment from the locally mirrored intent and queue the confirmation emails"""
     try:
         data = request.get_json()
         payment_intent_id = data.get('payment_intent_id')
@@ -373,49 +459,35 @@ def confirm_payment():
         if not payment_intent_id:
             return jsonify({'error': 'Payment intent ID required'}), 400
         
-        # Retrieve payment intent from Stripe
-        try:
-            payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-        except Exception as e:
-            print(f"Error retrieving payment intent: {str(e)}")
-            return jsonify({'error': 'Invalid payment intent'}), 400
+        # payment_intent.* webhooks keep the mirror current; Stripe is only asked
+        # when the intent is unknown here or its success has not been recorded yet
+        payment_intent = db.session.get(StripePaymentIntent, payment_intent_id)
+        if payment_intent is None or payment_intent.status != 'succeeded':
+            try:
+                retrieved = stripe.PaymentIntent.retrieve(payment_intent_id)
+            except Exception as e:
+                print(f"Error retrieving payment intent: {str(e)}")
+                return jsonify({'error': 'Invalid payment intent'}), 400
+            try:
+                payment_intent = stripe_mirror.upsert(retrieved)
+            except IntegrityError:
+                # The webhook worker mirrored the same intent in between; update its row instead
+                db.session.rollback()
+                payment_intent = stripe_mirror.upsert(retrieved)
         
         if payment_intent.status != 'succeeded':
             return jsonify({'error': 'Payment not successful'}), 400
         
-        # Extract metadata
-        metadata = payment_intent.metadata
-        customer_data = {
-            'name': metadata.get('customer_name'),
-            'email': metadata.get('customer_email'),
-            'company': metadata.get('company'),
-            'phone': '',  # Not stored in metadata
-            'shopify_url': ''  # Not stored in metadata
-        }
-        
+        metadata = payment_intent.metadata_json or {}
         plan_name = metadata.get('plan_name')
         amount = payment_intent.amount / 100  # Convert from cents to dollars
         
-        # Send confirmation emails
-        customer_email_sent = send_payment_confirmation_email(
-            customer_data['email'],
-            customer_data['name'],
-            plan_name,
-            amount,
-            is_recurring=True  # All plans have recurring components
-        )
-        
-        notification_email_sent = send_payment_notification_email(
-            customer_data,
-            plan_name,
-            amount,
-            is_recurring=True
-        )
+        # Emails go out on the background pool (deduplicated with the webhook)
+        background.submit(send_payment_emails_once, payment_intent_id)
         
         return jsonify({
             'success': True,
-            'customer_email_sent': customer_email_sent,
-            'notification_email_sent': notification_email_sent,
+            'emails_queued': True,
             'amount': amount,
             'plan_name': plan_name
         })
@@ -440,25 +512,43 @@ def stripe_webhook():
     except stripe.error.SignatureVerificationError:
         return jsonify({'error': 'Invalid signature'}), 400
     
-    # Handle the event
-    if event['type'] == 'payment_intent.succeeded':
-        payment_intent = event['data']['object']
-        print(f"✅ Payment succeeded: {payment_intent['id']}")
-        
-        # Extract customer data from metadata
-        metadata = payment_intent.get('metadata', {})
-        customer_email = metadata.get('customer_email')
-        customer_name = metadata.get('customer_name')
-        company = metadata.get('company')
+    # Persist and acknowledge right away; a background worker does the processing
+    is_new = record_event(event['id'], event['type'], payload.decode('utf-8'))
+    if not is_new:
+        print(f"🔍 Duplicate Stripe event dropped: {event['id']}")
+    
+    return jsonify({'status': 'success', 'duplicate': not is_new})
+
+@handles_event('payment_intent.succeeded')
+def handle_payment_intent_succeeded(event):
+    """Send confirmation emails for a successful setup-fee payment"""
+    payment_intent = event['data']['object']
+    print(f"✅ Payment succeeded: {payment_intent['id']}")
+    
+    # The mirror handler has already stored the intent, which the email claim relies on
+    send_payment_emails_once(payment_intent['id'])
+
+@handles_event('checkout.session.completed')
+def handle_checkout_session_completed(event):
+    """Send confirmation emails for a completed embedded checkout"""
+    session = event['data']['object']
+    print(f"✅ Checkout session completed: {session['id']}")
+    
+    # Extract customer data from session
+    customer_email = session.get('customer_email')
+    customer_name = session.get('customer_details', {}).get('name')
+    metadata = session.get('metadata', {})
+    
+    if customer_email and metadata:
         plan_name = metadata.get('plan_name')
+        company = metadata.get('company')
+        amount = session.get('amount_total', 0) / 100  # Convert from cents to dollars
         
-        if customer_email and customer_name and plan_name:
-            amount = payment_intent['amount'] / 100  # Convert from cents to dollars
-            
+        if plan_name:
             # Prepare customer data
             customer_data = {
                 'email': customer_email,
-                'name': customer_name,
+                'name': customer_name or 'Customer',
                 'company': company or 'N/A'
             }
             
@@ -466,7 +556,7 @@ def stripe_webhook():
             try:
                 customer_email_sent = send_payment_confirmation_email(
                     customer_email,
-                    customer_name,
+                    customer_name or 'Customer',
                     plan_name,
                     amount,
                     is_recurring=True
@@ -479,138 +569,127 @@ def stripe_webhook():
                     is_recurring=True
                 )
                 
-                print(f"✅ Payment emails sent - Customer: {customer_email_sent}, Admin: {notification_email_sent}")
+                print(f"✅ Checkout emails sent - Customer: {customer_email_sent}, Admin: {notification_email_sent}")
                 
             except Exception as e:
-                print(f"❌ Error sending payment emails: {str(e)}")
-        else:
-            print(f"❌ Missing customer data in payment metadata")
-        
-    elif event['type'] == 'checkout.session.completed':
-        session = event['data']['object']
-        print(f"✅ Checkout session completed: {session['id']}")
-        
-        # Extract customer data from session
-        customer_email = session.get('customer_email')
-        customer_name = session.get('customer_details', {}).get('name')
-        metadata = session.get('metadata', {})
-        
-        if customer_email and metadata:
-            plan_name = metadata.get('plan_name')
-            company = metadata.get('company')
-            amount = session.get('amount_total', 0) / 100  # Convert from cents to dollars
-            
-            if plan_name:
-                # Prepare customer data
-                customer_data = {
-                    'email': customer_email,
-                    'name': customer_name or 'Customer',
-                    'company': company or 'N/A'
-                }
-                
-                # Send confirmation emails
-                try:
-                    customer_email_sent = send_payment_confirmation_email(
-                        customer_email,
-                        customer_name or 'Customer',
-                        plan_name,
-                        amount,
-                        is_recurring=True
-                    )
-                    
-                    notification_email_sent = send_payment_notification_email(
-                        customer_data,
-                        plan_name,
-                        amount,
-                        is_recurring=True
-                    )
-                    
-                    print(f"✅ Checkout emails sent - Customer: {customer_email_sent}, Admin: {notification_email_sent}")
-                    
-                except Exception as e:
-                    print(f"❌ Error sending checkout emails: {str(e)}")
-        
-    elif event['type'] == 'invoice.payment_succeeded':
-        invoice = event['data']['object']
-        print(f"✅ Subscription payment succeeded: {invoice['id']}")
-        
-    elif event['type'] == 'invoice.payment_failed':
-        invoice = event['data']['object']
-        print(f"❌ Subscription payment failed: {invoice['id']}")
-        
-    return jsonify({'status': 'success'})
+                print(f"❌ Error sending checkout emails: {str(e)}")
+
+@handles_event('customer.created', 'customer.updated', 'customer.deleted')
+def handle_customer_event(event):
+    """Keep the local email -> customer index in sync"""
+    customer = event['data']['object']
+    apply_customer_event(event['type'], customer)
+    print(f"✅ Customer index updated from {event['type']}: {customer['id']}")
+
+@handles_event('checkout.session.completed', 'checkout.session.expired')
+def handle_checkout_session_closed(event):
+    """Stop handing out a checkout session once it is paid or expired"""
+    checkout_sessions.forget(event['data']['object']['id'])
+
+@handles_event('invoice.payment_succeeded')
+def handle_invoice_payment_succeeded(event):
+    invoice = event['data']['object']
+    print(f"✅ Subscription payment succeeded: {invoice['id']}")
+
+@handles_event('invoice.payment_failed')
+def handle_invoice_payment_failed(event):
+    invoice = event['data']['object']
+    print(f"❌ Subscription payment failed: {invoice['id']}")
 
 
 
 @payment_bp.route('/create-checkout-session', methods=['POST'])
+@idempotent
 def create_checkout_session():
     try:
         data = request.get_json()
-        plan = data.get('plan', 'professional')
+        plan = get_plan(data.get('plan'))
+        if plan is None:
+            return jsonify({'error': 'Invalid plan selected'}), 400
         customer_name = data.get('name', 'Customer')
         customer_email = data.get('email', 'customer@example.com')
         customer_company = data.get('company', 'Company')
         customer_website = data.get('website', 'https://example.com')
-        
-        # Plan pricing
-        plan_config = {
-            'growth': {'setup_fee': 2997, 'monthly_fee': 997, 'name': 'Growth Plan'},
-            'professional': {'setup_fee': 4997, 'monthly_fee': 1497, 'name': 'Professional Plan'},
-            'enterprise': {'setup_fee': 9997, 'monthly_fee': 2997, 'name': 'Enterprise Plan'}
+        # Visitors who leave the email blank all share the placeholder customer,
+        # so their sessions must never be handed to each other
+        reusable = bool(data.get('email'))
+        metadata = {
+            'plan': plan.key,
+            'customer_name': customer_name,
+            'customer_email': customer_email,
+            'customer_company': customer_company,
+            'customer_website': customer_website,
+            'setup_fee': plan.setup_fee,
+            'monthly_fee': plan.monthly_fee
         }
         
-        current_plan = plan_config.get(plan, plan_config['professional'])
-        
-        # Create or retrieve customer
-        customers = stripe.Customer.list(email=customer_email, limit=1)
-        if customers.data:
-            customer = customers.data[0]
-        else:
-            customer = stripe.Customer.create(
-                email=customer_email,
-                name=customer_name,
+        for attempt in range(2):
+            # A retry runs with a different customer, so its Stripe calls need their own keys
+            suffix = '' if attempt == 0 else ':retry'
+            
+            # Create or retrieve customer (local index first, Stripe search only on a miss)
+            customer_id, _ = resolve_customer(
+                customer_email,
+                customer_name,
                 metadata={
                     'company': customer_company,
                     'website': customer_website,
-                    'plan': plan
-                }
+                    'plan': plan.key
+                },
+                search_stripe=True,
+                idempotency_key=stripe_idempotency_key('customer' + suffix)
             )
+            
+            # A reload or back-navigation gets the session already open for this customer, plan and details
+            open_session = checkout_sessions.find_open(customer_id, plan.key, metadata) if reusable else None
+            if open_session is not None:
+                return jsonify({
+                    'client_secret': open_session[1],
+                    'customer_id': customer_id,
+                    'plan_info': dict(plan.public_info),
+                    'reused': True
+                })
+            
+            # Create checkout session
+            try:
+                checkout_session = stripe.checkout.Session.create(
+                    customer=customer_id,
+                    payment_method_types=['card'],
+                    line_items=[
+                        {
+                            'price_data': {
+                                'currency': 'usd',
+                                'product_data': {
+                                    'name': plan.setup_product_name,
+                                    'description': plan.setup_product_description
+                                },
+                                'unit_amount': plan.setup_fee_cents,
+                            },
+                            'quantity': 1,
+                        }
+                    ],
+                    mode='payment',
+                    ui_mode='embedded',
+                    return_url=request.host_url + 'payment-success?session_id={CHECKOUT_SESSION_ID}',
+                    metadata=metadata,
+                    idempotency_key=stripe_idempotency_key('checkout_session' + suffix)
+                )
+                break
+            except stripe.error.InvalidRequestError as e:
+                if attempt == 0 and is_missing_customer(e):
+                    print(f"❌ Indexed Stripe customer {customer_id} no longer exists, resolving again")
+                    forget_customer(customer_id)
+                    continue
+                raise
         
-        # Create checkout session
-        checkout_session = stripe.checkout.Session.create(
-            customer=customer.id,
-            payment_method_types=['card'],
-            line_items=[
-                {
-                    'price_data': {
-                        'currency': 'usd',
-                        'product_data': {
-                            'name': f"{current_plan['name']} - Setup Fee",
-                            'description': f"One-time setup fee for {current_plan['name']}"
-                        },
-                        'unit_amount': current_plan['setup_fee'] * 100,  # Convert to cents
-                    },
-                    'quantity': 1,
-                }
-            ],
-            mode='payment',
-            ui_mode='embedded',
-            return_url=request.host_url + 'payment-success?session_id={CHECKOUT_SESSION_ID}',
-            metadata={
-                'plan': plan,
-                'customer_name': customer_name,
-                'customer_email': customer_email,
-                'customer_company': customer_company,
-                'customer_website': customer_website,
-                'setup_fee': current_plan['setup_fee'],
-                'monthly_fee': current_plan['monthly_fee']
-            }
-        )
+        if reusable:
+            checkout_sessions.remember(customer_id, plan.key, metadata, checkout_session)
         
         return jsonify({
             'client_secret': checkout_session.client_secret,
-            'customer_id': customer.id,
-            'plan_info': current_plan
+            'customer_id': customer_id,
+            'plan_info': dict(plan.public_info),
+            'reused': False
         })
         
     except Exception as e:
@@ -4,18 +4,38 @@ import os
 import requests
 import json
 from datetime import datetime
+from src.config import SENDGRID_API_BASE, HUBSPOT_API_BASE
+from src.services.plan_catalog import ROI_REFERENCE_PLAN
+from src.services.leads import record_lead
+from src.services import lead_quantiles
+from src.services import store_index
+from src.services import spam_filter
+from src.services import submission_dedup
 
 roi_bp = Blueprint('roi', __name__)
 
+# How many similar past submissions the ROI report cites
+COMPARABLE_STORES = int(os.environ.get('COMPARABLE_STORES', 5))
+
 @roi_bp.route('/roi-calculator', methods=['POST', 'OPTIONS'])
 @cross_origin(origins='*')
 def roi_calculator():
     if request.method == 'OPTIONS':
         return '', 200
     
+    submission = claim_token = None
     try:
         data = request.get_json()
         
+        # Double-clicks and refreshes get the first response back, without new emails or HubSpot calls
+        submission = submission_dedup.fingerprint(data)
+        earlier, claim_token = submission_dedup.claim(submission)
+        if earlier is not None:
+            print(f"🔍 DEBUG: Duplicate ROI submission from {data.get('email', '')}, replaying the earlier response")
+            response = jsonify(earlier)
+            response.headers['X-Duplicate-Submission'] = 'true'
+            return response
+        
         # Extract form data with safe conversion
         def safe_float_conversion(value, default=0):
             """Safely convert value to float, handling empty strings and None"""
@@ -51,35 +71,107 @@ def roi_calculator():
             business_category, current_conversion_rate, cart_abandonment_rate
         )
         
+        # Metrics the form actually filled in; blanks are not counted as zeros
+        provided = {
+            'monthly_revenue': monthly_revenue,
+            'current_conversion_rate': current_conversion_rate,
+            'cart_abandonment_rate': cart_abandonment_rate
+        }
+        observed = {metric: value for metric, value in provided.items() if data.get(metric) not in (None, '', 'undefined')}
+        if 'monthly_revenue' in observed:
+            observed['monthly_increase'] = roi_data['monthly_increase']
+        
+        # Cheap junk check before anything that costs a provider call
+        verdict = spam_filter.check(data, email, spam_filter.client_ip(request), business_category, observed)
+        
         # Debug logging
         print(f"🔍 DEBUG: Processing ROI calculator for {email}")
         print(f"🔍 DEBUG: SendGrid API key configured: {'Yes' if os.environ.get('SENDGRID_API_KEY') else 'No'}")
         
-        # Send ROI report email to user
-        email_success = send_roi_report_email(email, first_name, roi_data, data)
-        print(f"🔍 DEBUG: ROI email success: {email_success}")
+        # Previous submissions closest to this store's numbers
+        store_features = {
+            'monthly_revenue': monthly_revenue,
+            'average_order_value': average_order_value,
+            'monthly_orders': monthly_orders,
+            'current_conversion_rate': current_conversion_rate,
+            'cart_abandonment_rate': cart_abandonment_rate
+        }
+        comparable_stores = store_index.nearest(store_features, k=COMPARABLE_STORES)
         
-        # Send lead notification to Chime (IMPROVED VERSION)
-        lead_success = send_lead_notification_email_improved(data, roi_data)
-        print(f"🔍 DEBUG: Lead notification success: {lead_success}")
+        if verdict.flagged:
+            # Still answered with the projections, but nothing is sent anywhere
+            email_success = lead_success = hubspot_success = False
+        else:
+            # Send ROI report email to user
+            email_success = send_roi_report_email(email, first_name, roi_data, data, comparable_stores)
+            print(f"🔍 DEBUG: ROI email success: {email_success}")
+            
+            # Send lead notification to Chime (IMPROVED VERSION)
+            lead_success = send_lead_notification_email_improved(data, roi_data)
+            print(f"🔍 DEBUG: Lead notification success: {lead_success}")
+            
+            # Submit to HubSpot (if configured)
+            hubspot_success = submit_to_hubspot(data, roi_data)
+            print(f"🔍 DEBUG: HubSpot success: {hubspot_success}")
+        
+        # Keep the submission for analytics and replays
+        lead_id = record_lead(
+            email=email,
+            first_name=first_name,
+            last_name=last_name,
+            company=company,
+            phone=phone,
+            website=website,
+            business_category=business_category,
+            business_stage=business_stage,
+            hours_week_manual_tasks=str(hours_week_manual_tasks),
+            biggest_challenges=biggest_challenges,
+            monthly_revenue=monthly_revenue,
+            average_order_value=average_order_value,
+            monthly_orders=monthly_orders,
+            current_conversion_rate=current_conversion_rate,
+            cart_abandonment_rate=cart_abandonment_rate,
+            monthly_ad_spend=monthly_ad_spend,
+            roi_data=roi_data,
+            lead_score=calculate_lead_score(dict(data, monthly_revenue=monthly_revenue), roi_data),
+            email_sent=email_success,
+            lead_notification_sent=lead_success,
+            hubspot_submitted=hubspot_success,
+            flagged_as_spam=verdict.flagged,
+            spam_reasons=verdict.reasons
+        )
         
-        # Submit to HubSpot (if configured)
-        hubspot_success = submit_to_hubspot(data, roi_data)
-        print(f"🔍 DEBUG: HubSpot success: {hubspot_success}")
+        if verdict.flagged:
+            # Kept with flagged_as_spam and spam_reasons for review
+            print(f"❌ ROI submission {lead_id} from {email} flagged as spam (score {verdict.score}): {', '.join(verdict.reasons)}")
+        else:
+            # Live peer benchmarks and the similarity index only learn from real stores
+            lead_quantiles.observe(business_category, observed)
+            if lead_id is not None:
+                store_index.add(lead_id, store_features, roi_data['monthly_increase'])
         
-        return jsonify({
+        result = {
             'success': True,
-            'message': 'ROI report sent successfully',
+            'message': 'ROI report calculated' if verdict.flagged else 'ROI report sent successfully',
+            'lead_id': lead_id,
             'roi_data': roi_data,
+            'benchmarks': lead_quantiles.summary(business_category),
+            'comparable_stores': [
+                {'similarity_distance': store['distance'], 'projected_monthly_increase': store['monthly_increase']}
+                for store in comparable_stores
+            ],
             'debug_info': {
                 'email_sent': email_success,
                 'lead_notification_sent': lead_success,
                 'hubspot_submitted': hubspot_success,
                 'sendgrid_configured': bool(os.environ.get('SENDGRID_API_KEY'))
             }
-        })
+        }
+        submission_dedup.complete(submission, claim_token, result)
+        return jsonify(result)
         
     except Exception as e:
+        submission_dedup.release(submission, claim_token)
         print(f"Error processing ROI calculator: {str(e)}")
         return jsonify({
             'success': False,
@@ -162,7 +254,7 @@ def calculate_roi_projections(monthly_revenue, average_order_value, monthly_orde
     annual_increase = monthly_increase * 12
     
     # ROI calculations
-    chime_investment = 2997  # Monthly Chime cost
+    chime_investment = ROI_REFERENCE_PLAN.monthly_fee  # Monthly Chime cost
     monthly_roi = (monthly_increase - chime_investment) / chime_investment * 100
     annual_roi = annual_increase / (chime_investment * 12) * 100
     
@@ -193,7 +285,7 @@ def send_email_via_sendgrid(to_email, subject, html_content, from_email="hello@c
             return False
         
         # Prepare SendGrid API request
-        url = "https://api.sendgrid.com/v3/mail/send"
+        url = f"{SENDGRID_API_BASE}/v3/mail/send"
         headers = {
             "Authorization": f"Bearer {sendgrid_api_key}",
             "Content-Type": "application/json"
@@ -320,7 +412,7 @@ To unsubscribe, reply with "unsubscribe"
         }
         
         response = requests.post(
-            "https://api.sendgrid.com/v3/mail/send",
+            f"{SENDGRID_API_BASE}/v3/mail/send",
             headers=headers,
             json=email_data
         )
@@ -340,7 +432,7 @@ To unsubscribe, reply with "unsubscribe"
         print(f"❌ Full traceback: {traceback.format_exc()}")
         return False
 
-def send_roi_report_email(email, first_name, roi_data, form_data=None):
+def send_roi_report_email(email, first_name, roi_data, form_data=None, comparable_stores=None):
     """
     Send ROI report email to user with improved deliverability
     Uses existing SendGrid infrastructure
@@ -373,6 +465,26 @@ def send_roi_report_email(email, first_name, roi_data, form_data=None):
         annual_increase = roi_data.get('annual_increase', 0)
         recovered_orders = (cart_abandonment_rate / 100) * monthly_orders * 0.6  # 60% recovery rate
         
+        # Peer comparison from live submissions, once the category has enough of them
+        peer_benchmark = ''
+        peers = lead_quantiles.summary(business_category)
+        conversion = peers.get('current_conversion_rate')
+        abandonment = peers.get('cart_abandonment_rate')
+        if conversion and abandonment and conversion['count'] >= lead_quantiles.QUANTILE_MIN_SAMPLES:
+            peer_benchmark = f"""
+                <p style="margin: 0 0 10px; font-size: 14px;">
+                    For comparison, the median {business_category} store in our analyses converts at {conversion['p50']:.1f}% with a cart abandonment rate of {abandonment['p50']:.0f}% (based on {conversion['count']:,} stores).
+                </p>"""
+        
+        # Outcomes of the most similar earlier submissions
+        comparable_summary = ''
+        if comparable_stores and len(comparable_stores) >= COMPARABLE_STORES:
+            increases = sorted(store['monthly_increase'] for store in comparable_stores)
+            comparable_summary = f"""
+                <p style="margin: 0 0 10px; font-size: 14px;">
+                    Among the {len(increases)} stores we have analyzed that are most similar to yours in revenue, order value, order volume, conversion and cart abandonment, the median projected monthly revenue opportunity was ${increases[len(increases) // 2]:,.0f}.
+                </p>"""
+        
         # Professional subject line (no promotional language)
         subject = f"Revenue Analysis Results for {company}"
         
@@ -431,7 +543,7 @@ def send_roi_report_email(email, first_name, roi_data, form_data=None):
                 <h3 style="margin: 0 0 15px; color: #2c3e50; font-size: 16px;">Current Business Metrics</h3>
                 <p style="margin: 0 0 10px; font-size: 14px;">
                     Your current conversion rate of {current_conversion_rate:.1f}% and cart abandonment rate of {cart_abandonment_rate:.0f}% indicate opportunities for optimization. You are currently spending {hours_week_manual_tasks} hours per week on manual tasks.
-                </p>
+                </p>{peer_benchmark}{comparable_summary}
                 <p style="margin: 0 0 15px; font-size: 14px;">
                     With {monthly_orders:.0f} monthly orders at an average order value of ${average_order_value:.0f}, there is potential to recover approximately {recovered_orders:.0f} orders monthly through optimization strategies.
                 </p>
@@ -774,7 +886,7 @@ Chime Business Solutions | hello@chimehq.co
         }
         
         response = requests.post(
-            "https://api.sendgrid.com/v3/mail/send",
+            f"{SENDGRID_API_BASE}/v3/mail/send",
             headers=headers,
             json=email_data
         )
@@ -865,7 +977,7 @@ def submit_to_hubspot(form_data, roi_data):
         print(f"🔍 Debug: Creating HubSpot contact for {form_data.get('email', '')}")
         
         # Create contact
-        contact_url = "https://api.hubapi.com/crm/v3/objects/contacts"
+        contact_url = f"{HUBSPOT_API_BASE}/crm/v3/objects/contacts"
         contact_headers = {
             "Authorization": f"Bearer {hubspot_api_key}",
             "Content-Type": "application/json"
@@ -881,7 +993,7 @@ def submit_to_hubspot(form_data, roi_data):
         elif contact_response.status_code == 409:
             # Contact already exists, update it
             email = form_data.get('email', '')
-            update_url = f"https://api.hubapi.com/crm/v3/objects/contacts/{email}?idProperty=email"
+            update_url = f"{HUBSPOT_API_BASE}/crm/v3/objects/contacts/{email}?idProperty=email"
             update_response = requests.patch(update_url, headers=contact_headers, json=contact_data)
             print(f"🔍 Debug: HubSpot contact update response status: {update_response.status_code}")
             if update_response.status_code == 200:
@@ -918,7 +1030,7 @@ def submit_to_hubspot(form_data, roi_data):
             ]
         }
         
-        deal_url = "https://api.hubapi.com/crm/v3/objects/deals"
+        deal_url = f"{HUBSPOT_API_BASE}/crm/v3/objects/deals"
         deal_response = requests.post(deal_url, headers=contact_headers, json=deal_data)
         
         print(f"🔍 Debug: HubSpot deal response status: {deal_response.status_code}")
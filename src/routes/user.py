@@ -1,12 +1,120 @@
-from flask import Blueprint, jsonify, request
+import hashlib
+import json
+import os
+import re
+from urllib.parse import urlencode
+from flask import Blueprint, Response, abort, jsonify, request, stream_with_context
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
 from src.models.user import User, db
+from src.services import user_cache
 
 user_bp = Blueprint('user', __name__)
 
+USERS_PAGE_DEFAULT_LIMIT = int(os.environ.get('USERS_PAGE_DEFAULT_LIMIT', 100))
+USERS_PAGE_MAX_LIMIT = int(os.environ.get('USERS_PAGE_MAX_LIMIT', 1000))
+USERS_EXPORT_BATCH_SIZE = int(os.environ.get('USERS_EXPORT_BATCH_SIZE', 1000))
+USERS_BULK_MAX_ROWS = int(os.environ.get('USERS_BULK_MAX_ROWS', 5000))
+
+# IN (...) lists are chunked to stay well under SQLite's bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+UNIQUE_FIELDS = ('username', 'email')
+
+# Columns a client may ask for with ?fields=; id is always returned since it is the cursor
+USER_FIELDS = {
+    'id': User.id,
+    'username': User.username,
+    'email': User.email
+}
+
+def user_etag(user_id, version):
+    return f'user-{user_id}-v{version}'
+
+def not_modified(etag):
+    """304 for a matching If-None-Match, before anything is serialized"""
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def requested_fields():
+    """Column names from ?fields= (id first), or an error message for an unknown one"""
+    fields = ['id']
+    for name in request.args.get('fields', ','.join(USER_FIELDS)).split(','):
+        name = name.strip()
+        if name and name not in fields:
+            if name not in USER_FIELDS:
+                return None, f'Unknown field: {name}'
+            fields.append(name)
+    return fields, None
+
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    """
+    One page of users ordered by id. ?after_id= continues after the last id of the
+    previous page (keyset, so every page costs the same); the next page's URL comes
+    back in the Link header.
+    """
+    limit = request.args.get('limit', USERS_PAGE_DEFAULT_LIMIT, type=int)
+    after_id = request.args.get('after_id', 0, type=int)
+    if not 1 <= limit <= USERS_PAGE_MAX_LIMIT:
+        return jsonify({'error': f'limit must be between 1 and {USERS_PAGE_MAX_LIMIT}'}), 400
+
+    fields, error = requested_fields()
+    if error:
+        return jsonify({'error': error}), 400
+
+    # Core select straight into dicts: no ORM identity map or User objects per row
+    rows = db.session.execute(
+        select(*[USER_FIELDS[name] for name in fields], User.version)
+        .where(User.id > after_id)
+        .order_by(User.id)
+        .limit(limit)
+    ).mappings().all()
+
+    # The page's ETag covers the request and every row's (id, version)
+    digest = hashlib.sha1(f"{','.join(fields)}|{after_id}|{limit}".encode('utf-8'))
+    for row in rows:
+        digest.update(f"|{row['id']}.{row['version']}".encode('utf-8'))
+    etag = f'users-{digest.hexdigest()}'
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    response = jsonify([{name: row[name] for name in fields} for row in rows])
+    response.set_etag(etag)
+    if len(rows) == limit:
+        next_after_id = rows[-1]['id']
+        args = request.args.to_dict()
+        args.update({'after_id': next_after_id, 'limit': limit})
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+        response.headers['X-Next-After-Id'] = str(next_after_id)
+    return response
+
+@user_bp.route('/users/export', methods=['GET'])
+def export_users():
+    """
+    Every user as newline-delimited JSON, streamed in id order.
+    Rows are fetched USERS_EXPORT_BATCH_SIZE at a time, so memory stays flat however big the table is.
+    """
+    fields, error = requested_fields()
+    if error:
+        return jsonify({'error': error}), 400
+
+    statement = select(*[USER_FIELDS[name] for name in fields]).order_by(User.id)
+
+    def generate():
+        result = db.session.execute(statement.execution_options(yield_per=USERS_EXPORT_BATCH_SIZE))
+        for partition in result.mappings().partitions():
+            yield ''.join(json.dumps(dict(row)) + '\n' for row in partition)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=users.ndjson'}
+    )
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
@@ -15,25 +123,263 @@ def create_user():
     user = User(username=data['username'], email=data['email'])
     db.session.add(user)
     db.session.commit()
-    return jsonify(user.to_dict()), 201
+    response = jsonify(user.to_dict())
+    response.set_etag(user_etag(user.id, user.version))
+    return response, 201
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), IN_CHUNK_SIZE):
+        yield values[start:start + IN_CHUNK_SIZE]
+
+def _bulk_payload(key):
+    """The request body as a list (a bare array or {key: [...]}), or an error message"""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get(key)
+    if not isinstance(data, list) or not data:
+        return None, f'Expected a non-empty JSON array (or {{"{key}": [...]}})'
+    if len(data) > USERS_BULK_MAX_ROWS:
+        return None, f'At most {USERS_BULK_MAX_ROWS} rows per request'
+    return data, None
+
+def _select_users(ids):
+    users = []
+    for chunk in _chunks(ids):
+        users.extend(dict(row) for row in db.session.execute(
+            select(User.id, User.username, User.email).where(User.id.in_(chunk)).order_by(User.id)
+        ).mappings())
+    return users
+
+def _check_unique(candidates, errors):
+    """
+    Drop candidates whose username/email repeats within the batch or belongs to another user.
+    candidates are (index, user_id or None, values); conflicts are appended to errors.
+    """
+    seen = {field: {} for field in UNIQUE_FIELDS}
+    unique = []
+    for index, user_id, values in candidates:
+        field = next((f for f in UNIQUE_FIELDS if f in values and values[f] in seen[f]), None)
+        if field:
+            errors.append({'index': index, 'field': field, 'error': f'Duplicate {field} in batch (row {seen[field][values[field]]})'})
+            continue
+        for f in UNIQUE_FIELDS:
+            if f in values:
+                seen[f][values[f]] = index
+        unique.append((index, user_id, values))
+
+    owners = {field: {} for field in UNIQUE_FIELDS}
+    for field in UNIQUE_FIELDS:
+        column = USER_FIELDS[field]
+        for chunk in _chunks(seen[field]):
+            owners[field].update(db.session.execute(select(column, User.id).where(column.in_(chunk))).all())
+
+    accepted = []
+    for index, user_id, values in unique:
+        field = next((f for f in UNIQUE_FIELDS if f in values and owners[f].get(values[f], user_id) != user_id), None)
+        if field:
+            errors.append({'index': index, 'field': field, 'error': f'{field} already exists'})
+            continue
+        accepted.append((index, user_id, values))
+    return accepted
+
+def _conflict_error(index, error):
+    message = str(error.orig)
+    field = next((f for f in UNIQUE_FIELDS if f'user.{f}' in message), None)
+    return {'index': index, 'field': field, 'error': f'{field or "value"} already exists'}
+
+def _apply_rows(rows, statement_for, errors):
+    """
+    Run one statement per accepted row inside a savepoint each, reporting unique violations per row.
+    The fallback when the executemany hit a conflict the pre-check could not see (a concurrent writer).
+    """
+    applied = []
+    for index, user_id, values in rows:
+        try:
+            with db.session.begin_nested():
+                result = db.session.execute(statement_for(user_id, values))
+            applied.append(user_id if user_id is not None else result.inserted_primary_key[0])
+        except IntegrityError as e:
+            errors.append(_conflict_error(index, e))
+    db.session.commit()
+    return applied
+
+@user_bp.route('/users/bulk', methods=['POST'])
+def bulk_create_users():
+    """Create many users in one transaction; rows with a taken username or email are reported and skipped"""
+    rows, error = _bulk_payload('users')
+    if error:
+        return jsonify({'error': error}), 400
+
+    errors = []
+    candidates = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict) or not row.get('username') or not row.get('email'):
+            errors.append({'index': index, 'error': 'username and email are required'})
+            continue
+        candidates.append((index, None, {'username': row['username'], 'email': row['email']}))
+
+    accepted = _check_unique(candidates, errors)
+    created_ids = []
+    if accepted:
+        try:
+            result = db.session.execute(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                [values for _, _, values in accepted]
+            )
+            created_ids = list(result.scalars())
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            created_ids = _apply_rows(accepted, lambda _, values: insert(User).values(**values), errors)
+
+    errors.sort(key=lambda e: e['index'])
+    return jsonify({'created': _select_users(created_ids), 'errors': errors})
+
+@user_bp.route('/users/bulk', methods=['PUT'])
+def bulk_update_users():
+    """Update many users by id in one transaction; unknown ids and unique conflicts are reported per row"""
+    rows, error = _bulk_payload('users')
+    if error:
+        return jsonify({'error': error}), 400
+
+    errors = []
+    candidates = []
+    seen_ids = {}
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict) or not isinstance(row.get('id'), int):
+            errors.append({'index': index, 'error': 'id is required'})
+            continue
+        values = {field: row[field] for field in UNIQUE_FIELDS if row.get(field)}
+        if not values:
+            errors.append({'index': index, 'error': 'Nothing to update (username or email)'})
+            continue
+        if row['id'] in seen_ids:
+            errors.append({'index': index, 'error': f'Duplicate id in batch (row {seen_ids[row["id"]]})'})
+            continue
+        seen_ids[row['id']] = index
+        candidates.append((index, row['id'], values))
+
+    existing = set()
+    for chunk in _chunks(seen_ids):
+        existing.update(db.session.execute(select(User.id).where(User.id.in_(chunk))).scalars())
+    for index, user_id, _ in candidates:
+        if user_id not in existing:
+            errors.append({'index': index, 'error': 'User not found'})
+    candidates = [candidate for candidate in candidates if candidate[1] in existing]
+
+    accepted = _check_unique(candidates, errors)
+    updated_ids = [user_id for _, user_id, _ in accepted]
+    if accepted:
+        # One executemany per set of columns being changed; every row's version is bumped
+        groups = {}
+        for _, user_id, values in accepted:
+            groups.setdefault(tuple(sorted(values)), []).append(dict({f'new_{k}': v for k, v in values.items()}, user_id=user_id))
+        try:
+            users = User.__table__  # Core table: a parameter list then means a plain executemany
+            for columns, params in groups.items():
+                db.session.execute(
+                    update(users)
+                    .where(users.c.id == bindparam('user_id'))
+                    .values(version=users.c.version + 1, **{column: bindparam(f'new_{column}') for column in columns}),
+                    params
+                )
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            updated_ids = _apply_rows(
+                accepted,
+                lambda user_id, values: update(User).where(User.id == user_id).values(version=User.version + 1, **values),
+                errors
+            )
+
+    user_cache.invalidate(*updated_ids)
+    errors.sort(key=lambda e: e['index'])
+    return jsonify({'updated': _select_users(updated_ids), 'errors': errors})
+
+@user_bp.route('/users/bulk', methods=['DELETE'])
+def bulk_delete_users():
+    """Delete many users by id in one transaction; unknown ids are reported"""
+    ids, error = _bulk_payload('ids')
+    if error:
+        return jsonify({'error': error}), 400
+
+    errors = []
+    wanted = {}
+    for index, user_id in enumerate(ids):
+        if not isinstance(user_id, int):
+            errors.append({'index': index, 'error': 'id must be an integer'})
+        else:
+            wanted.setdefault(user_id, index)
+
+    deleted = []
+    for chunk in _chunks(wanted):
+        deleted.extend(db.session.execute(
+            delete(User).where(User.id.in_(chunk)).returning(User.id)
+        ).scalars())
+    db.session.commit()
+    user_cache.invalidate(*deleted)
+
+    for user_id in sorted(set(wanted) - set(deleted), key=wanted.get):
+        errors.append({'index': wanted[user_id], 'error': 'User not found'})
+    errors.sort(key=lambda e: e['index'])
+    return jsonify({'deleted': sorted(deleted), 'errors': errors})
+
+def _user_response(user_id):
+    # Read-through: a hit never touches the session or the database
+    row = user_cache.get(user_id)
+    if row is None:
+        generation = user_cache.generation()
+        row = db.session.execute(
+            select(User.id, User.username, User.email, User.version).where(User.id == user_id)
+        ).mappings().first()
+        if row is None:
+            abort(404)
+        row = dict(row)
+        user_cache.put(user_id, row, generation)
+    etag = user_etag(row['id'], row['version'])
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    response = jsonify({'id': row['id'], 'username': row['username'], 'email': row['email']})
+    response.set_etag(etag)
+    return response
 
 @user_bp.route('/users/<int:user_id>', methods=['GET'])
 def get_user(user_id):
-    user = User.query.get_or_404(user_id)
-    return jsonify(user.to_dict())
+    return _user_response(user_id)
 
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
 def update_user(user_id):
-    user = User.query.get_or_404(user_id)
+    """
+    Update a user. With If-Match the write only happens if the row is still at that
+    version; the check and the write are one UPDATE, so there is no race in between.
+    """
     data = request.json
-    user.username = data.get('username', user.username)
-    user.email = data.get('email', user.email)
+    statement = update(User).where(User.id == user_id)
+    if request.if_match and not request.if_match.star_tag:
+        versions = [
+            int(match.group(1)) for match in
+            (re.fullmatch(rf'user-{user_id}-v(\d+)', tag) for tag in request.if_match.as_set())
+            if match
+        ]
+        statement = statement.where(User.version.in_(versions))
+
+    values = {field: data[field] for field in UNIQUE_FIELDS if field in data}
+    result = db.session.execute(statement.values(version=User.version + 1, **values))
+    if result.rowcount == 0:
+        db.session.rollback()
+        if db.session.get(User, user_id) is None:
+            abort(404)
+        return jsonify({'error': 'User was modified since it was fetched'}), 412
     db.session.commit()
-    return jsonify(user.to_dict())
+    user_cache.invalidate(user_id)
+    return _user_response(user_id)
 
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     db.session.delete(user)
     db.session.commit()
+    user_cache.invalidate(user_id)
     return '', 204
@@ -0,0 +1,27 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS', 8))
+
+_executor = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix='background')
+
+
+def submit(fn, *args, **kwargs):
+    """
+    Run fn on the shared thread pool inside an app context for the current app.
+    Request-scoped values (request, g) are not available there, so resolve them first.
+    """
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            return fn(*args, **kwargs)
+
+    return _executor.submit(run)
+
+
+def queue_depth():
+    """Tasks submitted but not yet picked up by a pool thread"""
+    return _executor._work_queue.qsize()
@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.billing import OpenCheckoutSession
+
+# Stop handing out a session this long before Stripe expires it, so the
+# customer never lands on a checkout that dies while they are typing
+CHECKOUT_SESSION_REUSE_MARGIN_SECONDS = int(os.environ.get('CHECKOUT_SESSION_REUSE_MARGIN_SECONDS', 30 * 60))
+
+
+def _usable(expires_at):
+    return expires_at - timedelta(seconds=CHECKOUT_SESSION_REUSE_MARGIN_SECONDS) > datetime.utcnow()
+
+
+def metadata_hash(metadata):
+    """sha256 of the metadata a session is created with, independent of key order"""
+    return hashlib.sha256(json.dumps(metadata, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def find_open(customer_id, plan_key, metadata):
+    """
+    Return (session_id, client_secret) of a reusable open session, or None.
+    Only a session created with the same metadata is reused: the webhook sends the
+    confirmation emails from the session's metadata, so corrected details need a new one.
+    Read from the database every time: forget() runs in whichever worker got the
+    webhook, so a per-process copy could hand out a session that is already closed.
+    """
+    row = db.session.get(OpenCheckoutSession, (customer_id, plan_key))
+    if row is None or row.metadata_hash != metadata_hash(metadata):
+        return None
+    if not _usable(row.expires_at):
+        forget(row.session_id)
+        return None
+    return row.session_id, row.client_secret
+
+
+def remember(customer_id, plan_key, metadata, session):
+    """Record a newly created embedded Checkout Session as the open one for (customer, plan)"""
+    key = (customer_id, plan_key)
+    expires_at = datetime.utcfromtimestamp(session['expires_at'])
+
+    try:
+        row = db.session.get(OpenCheckoutSession, key)
+        if row is None:
+            row = OpenCheckoutSession(customer_id=customer_id, plan=plan_key)
+            db.session.add(row)
+        row.session_id = session['id']
+        row.client_secret = session['client_secret']
+        row.metadata_hash = metadata_hash(metadata)
+        row.expires_at = expires_at
+        row.created_at = datetime.utcnow()
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request stored its session first; keep that one
+        db.session.rollback()
+
+
+def forget(session_id):
+    """Stop reusing a session (completed, expired, or about to expire)"""
+    OpenCheckoutSession.query.filter_by(session_id=session_id).delete()
+    db.session.commit()
+
@@ -0,0 +1,134 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import stripe
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.billing import StripeCustomerIndex
+
+CUSTOMER_INDEX_LRU_SIZE = int(os.environ.get('CUSTOMER_INDEX_LRU_SIZE', 10000))
+
+_lock = threading.Lock()
+_lru = OrderedDict()  # email -> customer_id
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+def _cache_put(email, customer_id):
+    with _lock:
+        _lru[email] = customer_id
+        _lru.move_to_end(email)
+        while len(_lru) > CUSTOMER_INDEX_LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def lookup(email):
+    """Return the Stripe customer id for an email from the LRU or SQLite, or None"""
+    email = normalize_email(email)
+    if not email:
+        return None
+
+    with _lock:
+        customer_id = _lru.get(email)
+        if customer_id is not None:
+            _lru.move_to_end(email)
+            return customer_id
+
+    row = db.session.get(StripeCustomerIndex, email)
+    if row is None:
+        return None
+    _cache_put(email, row.customer_id)
+    return row.customer_id
+
+
+def remember(email, customer_id):
+    """Record (or move) the email -> customer id mapping"""
+    email = normalize_email(email)
+    if not email or not customer_id:
+        return
+
+    try:
+        row = db.session.get(StripeCustomerIndex, email)
+        if row is None:
+            row = StripeCustomerIndex(email=email)
+            db.session.add(row)
+        row.customer_id = customer_id
+        row.updated_at = datetime.utcnow()
+        db.session.commit()
+    except IntegrityError:
+        # Another request indexed the same email first
+        db.session.rollback()
+    _cache_put(email, customer_id)
+
+
+def forget(customer_id):
+    """Drop every mapping that points at a (deleted) customer"""
+    StripeCustomerIndex.query.filter_by(customer_id=customer_id).delete()
+    db.session.commit()
+    with _lock:
+        for email in [e for e, c in _lru.items() if c == customer_id]:
+            del _lru[email]
+
+
+def is_missing_customer(error):
+    """
+    True for Stripe's error on a customer id that no longer exists: the index was
+    stale (customer deleted in Stripe and the webhook missed, or an old LRU entry)
+    """
+    return (
+        isinstance(error, stripe.error.InvalidRequestError)
+        and error.code == 'resource_missing'
+        and (error.param == 'customer' or 'No such customer' in str(error))
+    )
+
+
+def apply_customer_event(event_type, customer):
+    """Keep the index in sync with customer.created/updated/deleted webhooks"""
+    customer_id = customer.get('id')
+    if event_type == 'customer.deleted':
+        forget(customer_id)
+        return
+
+    email = normalize_email(customer.get('email'))
+    if not email:
+        return
+    # An email change moves the customer to a new key. The old keys are dropped in
+    # their own transaction, so a failed insert below cannot roll them back.
+    stale = StripeCustomerIndex.query.filter(
+        StripeCustomerIndex.customer_id == customer_id,
+        StripeCustomerIndex.email != email
+    )
+    stale_emails = [row.email for row in stale]
+    if stale_emails:
+        stale.delete(synchronize_session=False)
+        db.session.commit()
+        with _lock:
+            for stale_email in stale_emails:
+                _lru.pop(stale_email, None)
+    remember(email, customer_id)
+
+
+def resolve_customer(email, name, metadata, search_stripe=False, idempotency_key=None):
+    """
+    Return (customer_id, created) for an email, creating the Stripe customer on a miss.
+    With search_stripe, a miss is first checked against Stripe's customer list so
+    customers created before the index existed are reused.
+    """
+    customer_id = lookup(email)
+    if customer_id:
+        return customer_id, False
+
+    if search_stripe and email:
+        customers = stripe.Customer.list(email=email, limit=1)
+        if customers.data:
+            customer_id = customers.data[0].id
+            remember(email, customer_id)
+            return customer_id, False
+
+    customer = stripe.Customer.create(email=email, name=name, metadata=metadata, idempotency_key=idempotency_key)
+    remember(email, customer.id)
+    return customer.id, True
@@ -0,0 +1,154 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import g, jsonify, make_response, request
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.billing import IdempotentResponse
+
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 24 * 60 * 60))
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', 10000))
+MAX_KEY_LENGTH = 200
+
+_lock = threading.Lock()
+_responses = OrderedDict()  # scoped key -> (status_code, body bytes, expires_at timestamp)
+_in_flight = {}  # scoped key -> [lock, number of requests holding or waiting on it]
+_stores_since_purge = 0
+
+
+def stripe_idempotency_key(call):
+    """
+    Derive the Idempotency-Key forwarded to one Stripe create call, or None without a client key.
+    Being asked for one also marks that the request has started work with side effects.
+    """
+    key = g.get('idempotency_key')
+    if not key:
+        return None
+    g.idempotency_work_started = True
+    return f"{key}:{request.endpoint}:{call}"
+
+
+def _cached(scoped_key):
+    now = time.time()
+    with _lock:
+        entry = _responses.get(scoped_key)
+        if entry is not None:
+            if entry[2] > now:
+                _responses.move_to_end(scoped_key)
+                return entry
+            del _responses[scoped_key]
+
+    row = db.session.get(IdempotentResponse, scoped_key)
+    if row is None or row.expires_at <= datetime.utcnow():
+        return None
+    entry = (row.status_code, row.body.encode('utf-8'), now + (row.expires_at - datetime.utcnow()).total_seconds())
+    _remember(scoped_key, entry)
+    return entry
+
+
+def _remember(scoped_key, entry):
+    with _lock:
+        _responses[scoped_key] = entry
+        _responses.move_to_end(scoped_key)
+        while len(_responses) > IDEMPOTENCY_CACHE_SIZE:
+            _responses.popitem(last=False)
+
+
+def _store(scoped_key, response):
+    global _stores_since_purge
+    body = response.get_data()
+    expires_at = datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+    _remember(scoped_key, (response.status_code, body, time.time() + IDEMPOTENCY_TTL_SECONDS))
+
+    db.session.add(IdempotentResponse(
+        key=scoped_key,
+        status_code=response.status_code,
+        body=body.decode('utf-8'),
+        expires_at=expires_at
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # An expired row for the same key is still on disk; replace it
+        db.session.rollback()
+        row = db.session.get(IdempotentResponse, scoped_key)
+        row.status_code = response.status_code
+        row.body = body.decode('utf-8')
+        row.created_at = datetime.utcnow()
+        row.expires_at = expires_at
+        db.session.commit()
+
+    _stores_since_purge += 1
+    if _stores_since_purge >= 100:
+        _stores_since_purge = 0
+        IdempotentResponse.query.filter(IdempotentResponse.expires_at <= datetime.utcnow()).delete()
+        db.session.commit()
+
+
+def _replay(entry):
+    response = make_response(entry[1], entry[0])
+    response.mimetype = 'application/json'
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _acquire(scoped_key):
+    with _lock:
+        holder = _in_flight.setdefault(scoped_key, [threading.Lock(), 0])
+        holder[1] += 1
+    holder[0].acquire()
+    return holder
+
+
+def _release(scoped_key, holder):
+    holder[0].release()
+    with _lock:
+        holder[1] -= 1
+        if holder[1] == 0:
+            _in_flight.pop(scoped_key, None)
+
+
+def idempotent(view):
+    """
+    Honor an Idempotency-Key header: the first request runs the view and its final
+    JSON response is cached for IDEMPOTENCY_TTL_SECONDS; retries with the same key
+    (including ones that arrive while the first is still running) get the cached copy.
+    A request rejected before any Stripe call (e.g. an invalid plan) leaves the key free.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f'Idempotency-Key must be at most {MAX_KEY_LENGTH} characters'}), 400
+
+        scoped_key = f"{request.endpoint}:{key}"
+        entry = _cached(scoped_key)
+        if entry is not None:
+            return _replay(entry)
+
+        holder = _acquire(scoped_key)
+        try:
+            entry = _cached(scoped_key)
+            if entry is not None:
+                return _replay(entry)
+
+            g.idempotency_key = key
+            response = make_response(view(*args, **kwargs))
+            # Like Stripe: successes are final, and so are client errors once work has started.
+            # Validation errors and server errors are not saved, so a corrected retry runs again.
+            final = 200 <= response.status_code < 300 or (
+                400 <= response.status_code < 500 and g.get('idempotency_work_started')
+            )
+            if final and response.is_json:
+                _store(scoped_key, response)
+            return response
+        finally:
+            _release(scoped_key, holder)
+
+    return wrapper
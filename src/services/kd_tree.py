@@ -0,0 +1,88 @@
+import heapq
+
+import numpy as np
+
+
+class KDTree:
+    """
+    Static KD-tree over an (n, d) array, built once and then read-only, so a
+    built tree can be shared between threads without locking. Leaves are
+    contiguous slices of a reordered copy of the points, so each leaf is one
+    vectorized distance computation.
+    """
+
+    def __init__(self, points, leaf_size=32):
+        points = np.asarray(points, dtype=np.float64)
+        self.leaf_size = leaf_size
+        self.order = np.arange(len(points))
+        self._dim = []
+        self._split = []
+        self._left = []
+        self._right = []
+        self._start = []
+        self._end = []
+        self._source = points
+        self._build(0, len(points))
+        self.points = points[self.order]  # leaf-contiguous copy
+        del self._source
+
+    def __len__(self):
+        return len(self.order)
+
+    def _build(self, start, end):
+        node = len(self._dim)
+        for column in (self._dim, self._split, self._left, self._right):
+            column.append(-1)
+        self._start.append(start)
+        self._end.append(end)
+        if end - start <= self.leaf_size:
+            return node
+
+        indices = self.order[start:end]
+        values = self._source[indices]
+        dim = int(np.argmax(values.max(axis=0) - values.min(axis=0)))
+        mid = (start + end) // 2
+        partition = np.argpartition(values[:, dim], mid - start)
+        self.order[start:end] = indices[partition]
+
+        self._dim[node] = dim
+        self._split[node] = float(self._source[self.order[mid], dim])
+        self._left[node] = self._build(start, mid)
+        self._right[node] = self._build(mid, end)
+        return node
+
+    def query(self, x, k):
+        """(squared distances, point indices) of the k nearest points to x, nearest first"""
+        x = np.asarray(x, dtype=np.float64)
+        best = []  # max-heap of (-squared distance, position)
+        worst = np.inf
+        stack = [(0, 0.0)]  # (node, squared distance lower bound)
+        while stack:
+            node, bound = stack.pop()
+            if bound >= worst:
+                continue
+            dim = self._dim[node]
+            if dim < 0:
+                start = self._start[node]
+                distances = ((self.points[start:self._end[node]] - x) ** 2).sum(axis=1)
+                # Only points that beat the current k-th best reach the Python loop
+                for offset in np.flatnonzero(distances < worst):
+                    item = (-distances[offset], start + offset)
+                    if len(best) < k:
+                        heapq.heappush(best, item)
+                    elif item[0] > best[0][0]:
+                        heapq.heapreplace(best, item)
+                    if len(best) == k:
+                        worst = -best[0][0]
+                continue
+            delta = x[dim] - self._split[node]
+            near, far = (self._left[node], self._right[node]) if delta < 0 else (self._right[node], self._left[node])
+            # Far side first onto the stack so the near side is searched first
+            stack.append((far, max(bound, delta * delta)))
+            stack.append((near, bound))
+
+        best.sort(reverse=True)
+        return (
+            np.array([-distance for distance, _ in best]),
+            self.order[np.array([position for _, position in best], dtype=np.intp)]
+        )
@@ -0,0 +1,143 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.lead import LeadQuantileSketch
+from src.services.leads import rollup_category
+from src.services.quantile_sketch import KLLSketch
+
+QUANTILE_SKETCH_K = int(os.environ.get('QUANTILE_SKETCH_K', 200))
+QUANTILE_FLUSH_SECONDS = float(os.environ.get('QUANTILE_FLUSH_SECONDS', 60))
+# Benchmarks are only quoted to customers once a category has this many stores
+QUANTILE_MIN_SAMPLES = int(os.environ.get('QUANTILE_MIN_SAMPLES', 20))
+
+METRICS = ('monthly_revenue', 'current_conversion_rate', 'cart_abandonment_rate', 'monthly_increase')
+ALL_CATEGORIES = 'all'
+
+_lock = threading.Lock()
+_views = {}   # (category, metric) -> sketch of everything known: persisted state plus local updates
+_deltas = {}  # (category, metric) -> sketch of local updates not yet persisted
+_thread = None
+
+
+def observe(business_category, values):
+    """Add one submission's metrics to its category's sketches and to the all-categories ones"""
+    with _lock:
+        for category in (rollup_category(business_category), ALL_CATEGORIES):
+            for metric in METRICS:
+                value = values.get(metric)
+                if value is None:
+                    continue
+                key = (category, metric)
+                _views.setdefault(key, KLLSketch(QUANTILE_SKETCH_K)).update(value)
+                _deltas.setdefault(key, KLLSketch(QUANTILE_SKETCH_K)).update(value)
+
+
+def summary(business_category, quantiles=(0.25, 0.5, 0.75)):
+    """{metric: {'count', 'p25', 'p50', 'p75'}} for a category (or 'all'), from the live sketches"""
+    category = rollup_category(business_category)
+    result = {}
+    with _lock:
+        for metric in METRICS:
+            sketch = _views.get((category, metric))
+            if sketch is None or sketch.n == 0:
+                continue
+            result[metric] = {'count': sketch.n}
+            for q in quantiles:
+                result[metric][f'p{int(q * 100)}'] = sketch.quantile(q)
+    return result
+
+
+def _persist(category, metric, delta, attempts=3):
+    """
+    Merge a delta into the stored sketch. The stored count only grows, so it doubles
+    as a version: a write made by another worker in between is retried, never lost.
+    """
+    for _ in range(attempts):
+        row = db.session.get(LeadQuantileSketch, (category, metric))
+        try:
+            if row is None:
+                db.session.add(LeadQuantileSketch(
+                    business_category=category, metric=metric, state=delta.to_dict(), count=delta.n
+                ))
+                db.session.commit()
+                return True
+            merged = KLLSketch.from_dict(row.state).merge(KLLSketch.from_dict(delta.to_dict()))
+            updated = LeadQuantileSketch.query.filter_by(business_category=category, metric=metric, count=row.count).update(
+                {'state': merged.to_dict(), 'count': merged.n, 'updated_at': datetime.utcnow()},
+                synchronize_session=False
+            )
+            db.session.commit()
+            if updated:
+                return True
+        except IntegrityError:
+            db.session.rollback()
+        db.session.expire_all()
+    return False
+
+
+def load():
+    """Rebuild the live views from the persisted sketches plus unflushed local updates"""
+    rows = LeadQuantileSketch.query.all()
+    with _lock:
+        for row in rows:
+            key = (row.business_category, row.metric)
+            view = KLLSketch.from_dict(row.state)
+            pending = _deltas.get(key)
+            if pending is not None:
+                view.merge(KLLSketch.from_dict(pending.to_dict()))
+            _views[key] = view
+
+
+def flush():
+    """Persist local updates and pick up other workers' (call inside an app context)"""
+    with _lock:
+        deltas = dict(_deltas)
+        _deltas.clear()
+
+    failed = {}
+    for (category, metric), delta in deltas.items():
+        try:
+            if not _persist(category, metric, delta):
+                failed[(category, metric)] = delta
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error persisting quantile sketch {category}/{metric}: {str(e)}")
+            failed[(category, metric)] = delta
+
+    if failed:
+        # Keep them for the next flush
+        with _lock:
+            for key, delta in failed.items():
+                pending = _deltas.get(key)
+                _deltas[key] = delta.merge(pending) if pending is not None else delta
+    load()
+
+
+def start_flusher(app):
+    """Load the persisted sketches and flush every QUANTILE_FLUSH_SECONDS (and at exit)"""
+    global _thread
+    if _thread is not None:
+        return
+
+    def flush_in_app():
+        with app.app_context():
+            flush()
+
+    def loop():
+        while True:
+            time.sleep(QUANTILE_FLUSH_SECONDS)
+            try:
+                flush_in_app()
+            except Exception as e:
+                print(f"❌ Error flushing quantile sketches: {str(e)}")
+
+    with app.app_context():
+        load()
+    _thread = threading.Thread(target=loop, name='quantile-flusher', daemon=True)
+    _thread.start()
+    atexit.register(flush_in_app)
@@ -0,0 +1,76 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from src.models.user import db
+from src.models.lead import Lead, LeadDailyRollup
+
+UPSERTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+
+def rollup_category(business_category):
+    return business_category or 'unspecified'
+
+
+def _add_to_rollup(created_at, business_category, monthly_revenue, monthly_increase, lead_score):
+    """Fold one lead into its (day, category) rollup row with a single upsert"""
+    day = created_at.date()
+    category = rollup_category(business_category)
+    upsert = UPSERTS.get(db.engine.dialect.name)
+    if upsert is None:
+        # No ON CONFLICT support: read-modify-write inside the lead's transaction
+        row = db.session.get(LeadDailyRollup, (day, category))
+        if row is None:
+            row = LeadDailyRollup(day=day, business_category=category, submissions=0,
+                                  monthly_revenue_sum=0, monthly_increase_sum=0, lead_score_sum=0)
+            db.session.add(row)
+        row.submissions += 1
+        row.monthly_revenue_sum += monthly_revenue
+        row.monthly_increase_sum += monthly_increase
+        row.lead_score_sum += lead_score
+        return
+
+    table = LeadDailyRollup.__table__
+    statement = upsert(table).values(
+        day=day,
+        business_category=category,
+        submissions=1,
+        monthly_revenue_sum=monthly_revenue,
+        monthly_increase_sum=monthly_increase,
+        lead_score_sum=lead_score
+    )
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.day, table.c.business_category],
+        set_={
+            'submissions': table.c.submissions + 1,
+            'monthly_revenue_sum': table.c.monthly_revenue_sum + statement.excluded.monthly_revenue_sum,
+            'monthly_increase_sum': table.c.monthly_increase_sum + statement.excluded.monthly_increase_sum,
+            'lead_score_sum': table.c.lead_score_sum + statement.excluded.lead_score_sum,
+        }
+    ))
+
+
+def record_lead(**fields):
+    """
+    Store one ROI submission with a single INSERT, fold it into the daily rollup in the
+    same transaction (unless flagged as spam), and return its id.
+    Storage problems are logged and never fail the submission itself (returns None).
+    """
+    fields.setdefault('created_at', datetime.utcnow())
+    try:
+        lead_id = db.session.execute(insert(Lead).values(**fields)).inserted_primary_key[0]
+        if not fields.get('flagged_as_spam'):
+            _add_to_rollup(
+                fields['created_at'],
+                fields.get('business_category'),
+                fields.get('monthly_revenue') or 0,
+                (fields.get('roi_data') or {}).get('monthly_increase') or 0,
+                fields.get('lead_score') or 0
+            )
+        db.session.commit()
+        return lead_id
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error storing lead for {fields.get('email')}: {str(e)}")
+        return None
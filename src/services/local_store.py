@@ -0,0 +1,119 @@
+import os
+import sqlite3
+import threading
+import time
+
+# A small SQLite file shared by every worker process on the host. It stands in
+# for a Redis-style store where one is not deployed.
+LOCAL_STORE_PATH = os.environ.get(
+    'LOCAL_STORE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'local_store.db')
+)
+LOCAL_STORE_MESSAGE_TTL_SECONDS = int(os.environ.get('LOCAL_STORE_MESSAGE_TTL_SECONDS', 600))
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+_published_since_purge = 0
+_counted_since_purge = 0
+
+
+def _connection():
+    """One connection per thread; autocommit, WAL so readers never block the writer"""
+    global _schema_ready
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        connection = sqlite3.connect(LOCAL_STORE_PATH, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        _local.connection = connection
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS messages ('
+                    'id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, message TEXT NOT NULL, created_at REAL NOT NULL)'
+                )
+                connection.execute('CREATE INDEX IF NOT EXISTS ix_messages_channel_id ON messages (channel, id)')
+                connection.execute(
+                    'CREATE TABLE IF NOT EXISTS counters ('
+                    'key TEXT NOT NULL, bucket INTEGER NOT NULL, count INTEGER NOT NULL, expires_at REAL NOT NULL, '
+                    'PRIMARY KEY (key, bucket))'
+                )
+                _schema_ready = True
+    return connection
+
+
+def publish(channel, message):
+    """Append a message to a channel; every subscriber (in any process) sees it on its next poll"""
+    global _published_since_purge
+    connection = _connection()
+    connection.execute(
+        'INSERT INTO messages (channel, message, created_at) VALUES (?, ?, ?)',
+        (channel, message, time.time())
+    )
+    _published_since_purge += 1
+    if _published_since_purge >= 100:
+        _published_since_purge = 0
+        connection.execute('DELETE FROM messages WHERE created_at < ?', (time.time() - LOCAL_STORE_MESSAGE_TTL_SECONDS,))
+
+
+def latest_message_id(channel):
+    row = _connection().execute('SELECT MAX(id) FROM messages WHERE channel = ?', (channel,)).fetchone()
+    return row[0] or 0
+
+
+def messages_since(channel, after_id):
+    """[(id, message)] published on a channel after after_id, oldest first"""
+    return _connection().execute(
+        'SELECT id, message FROM messages WHERE channel = ? AND id > ? ORDER BY id',
+        (channel, after_id)
+    ).fetchall()
+
+
+def count_in_window(key, window_seconds, now=None):
+    """
+    Count one event for key in the current fixed window of window_seconds, shared by
+    every process on the host. Returns (previous window's count, current window's count
+    including this event, fraction of the current window elapsed) for sliding-window
+    estimates.
+    """
+    global _counted_since_purge
+    now = time.time() if now is None else now
+    bucket = int(now // window_seconds)
+    connection = _connection()
+    connection.execute(
+        'INSERT INTO counters (key, bucket, count, expires_at) VALUES (?, ?, 1, ?) '
+        'ON CONFLICT (key, bucket) DO UPDATE SET count = count + 1',
+        (key, bucket, (bucket + 2) * window_seconds)
+    )
+    counts = dict(connection.execute(
+        'SELECT bucket, count FROM counters WHERE key = ? AND bucket IN (?, ?)',
+        (key, bucket - 1, bucket)
+    ).fetchall())
+    _counted_since_purge += 1
+    if _counted_since_purge >= 1000:
+        _counted_since_purge = 0
+        connection.execute('DELETE FROM counters WHERE expires_at < ?', (now,))
+    return counts.get(bucket - 1, 0), counts.get(bucket, 1), now / window_seconds - bucket
+
+
+def subscribe(channel, callback, poll_seconds):
+    """
+    Call callback(message) for every message published on a channel from now on.
+    Polls on a daemon thread, so delivery lags by up to poll_seconds.
+    """
+    def poll():
+        last_id = latest_message_id(channel)
+        while True:
+            time.sleep(poll_seconds)
+            try:
+                for message_id, message in messages_since(channel, last_id):
+                    last_id = message_id
+                    callback(message)
+            except Exception as e:
+                print(f"❌ Error polling local store channel {channel}: {str(e)}")
+
+    thread = threading.Thread(target=poll, name=f'local-store-{channel}', daemon=True)
+    thread.start()
+    return thread
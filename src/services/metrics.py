@@ -0,0 +1,68 @@
+import os
+import threading
+from collections import deque
+
+# Latency percentiles are computed over this many recent samples per timer
+METRICS_SAMPLE_SIZE = int(os.environ.get('METRICS_SAMPLE_SIZE', 1024))
+
+_lock = threading.Lock()
+_counters = {}
+_timers = {}  # name -> {'count', 'total', 'max', 'samples'}
+_gauges = {}  # name -> zero-argument callable read at snapshot time
+
+
+def increment(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def observe(name, seconds):
+    """Record one duration for a timer"""
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            timer = _timers[name] = {'count': 0, 'total': 0.0, 'max': 0.0, 'samples': deque(maxlen=METRICS_SAMPLE_SIZE)}
+        timer['count'] += 1
+        timer['total'] += seconds
+        timer['max'] = max(timer['max'], seconds)
+        timer['samples'].append(seconds)
+
+
+def register_gauge(name, fn):
+    """Expose a value computed on demand, e.g. a pool or cache statistic"""
+    with _lock:
+        _gauges[name] = fn
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _summarize(timer):
+    ordered = sorted(timer['samples'])
+    return {
+        'count': timer['count'],
+        'mean_ms': round(timer['total'] / timer['count'] * 1000, 2),
+        'p50_ms': round(_percentile(ordered, 0.50) * 1000, 2),
+        'p95_ms': round(_percentile(ordered, 0.95) * 1000, 2),
+        'p99_ms': round(_percentile(ordered, 0.99) * 1000, 2),
+        'max_ms': round(timer['max'] * 1000, 2),
+    }
+
+
+def snapshot():
+    """Current value of every counter, timer and gauge"""
+    with _lock:
+        counters = dict(_counters)
+        timers = {name: _summarize(timer) for name, timer in _timers.items()}
+        gauges = dict(_gauges)
+
+    gauge_values = {}
+    for name, fn in gauges.items():
+        try:
+            gauge_values[name] = fn()
+        except Exception as e:
+            print(f"❌ Error reading gauge {name}: {str(e)}")
+            gauge_values[name] = None
+
+    return {'counters': counters, 'timers': timers, 'gauges': gauge_values}
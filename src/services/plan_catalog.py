@@ -0,0 +1,56 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+# Single source of truth for plan pricing. Everything a payment path needs is
+# precomputed here once at import; the structures are immutable.
+Plan = namedtuple('Plan', [
+    'key',
+    'name',
+    'setup_fee',             # dollars
+    'monthly_fee',           # dollars
+    'setup_fee_cents',
+    'monthly_fee_cents',
+    'setup_lookup_key',      # Stripe price lookup keys
+    'monthly_lookup_key',
+    'setup_product_name',    # Stripe product display names
+    'setup_product_description',
+    'monthly_product_name',
+    'public_info',           # read-only view returned to the front end as plan_info
+])
+
+DEFAULT_PLAN_KEY = 'professional'
+
+_PLAN_DEFINITIONS = (
+    # key, display name, setup fee ($), monthly fee ($)
+    ('growth', 'Growth Plan', 2997, 997),
+    ('professional', 'Professional Plan', 4997, 1497),
+    ('enterprise', 'Enterprise Plan', 9997, 2997),
+)
+
+
+def _build_plan(key, name, setup_fee, monthly_fee):
+    return Plan(
+        key=key,
+        name=name,
+        setup_fee=setup_fee,
+        monthly_fee=monthly_fee,
+        setup_fee_cents=setup_fee * 100,
+        monthly_fee_cents=monthly_fee * 100,
+        setup_lookup_key=f"chime_{key}_setup",
+        monthly_lookup_key=f"chime_{key}_monthly",
+        setup_product_name=f"{name} - Setup Fee",
+        setup_product_description=f"One-time setup fee for {name}",
+        monthly_product_name=f"{name} - Monthly Service",
+        public_info=MappingProxyType({'name': name, 'setup_fee': setup_fee, 'monthly_fee': monthly_fee}),
+    )
+
+
+PLANS = MappingProxyType({definition[0]: _build_plan(*definition) for definition in _PLAN_DEFINITIONS})
+
+# The monthly cost used for ROI projections in the calculator
+ROI_REFERENCE_PLAN = PLANS['enterprise']
+
+
+def get_plan(key):
+    """Return the Plan for a key (the default plan when no key is given), or None if unknown"""
+    return PLANS.get(key or DEFAULT_PLAN_KEY)
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+import stripe
+from src.models.user import db
+from src.models.billing import StripePrice
+
+# How long a resolved price is trusted before it is re-checked against Stripe
+PRICE_REFRESH_SECONDS = int(os.environ.get('STRIPE_PRICE_REFRESH_SECONDS', 24 * 60 * 60))
+
+_lock = threading.Lock()
+_prices = {}  # lookup_key -> (price_id, unit_amount, interval, refreshed_at timestamp)
+
+
+def _is_fresh(refreshed_at, now):
+    return now - refreshed_at < PRICE_REFRESH_SECONDS
+
+
+def _matches(price, unit_amount, interval):
+    recurring = price.get('recurring') or {}
+    return price.get('unit_amount') == unit_amount and recurring.get('interval') == interval
+
+
+def _fetch_or_create(lookup_key, unit_amount, product_name, interval, currency):
+    """Find the active Price for lookup_key on Stripe, creating it if missing or out of date"""
+    existing = stripe.Price.list(lookup_keys=[lookup_key], active=True, limit=1)
+    if existing.data and _matches(existing.data[0], unit_amount, interval):
+        return existing.data[0].id
+
+    print(f"🔍 Creating Stripe price for {lookup_key}")
+    params = {
+        'unit_amount': unit_amount,
+        'currency': currency,
+        'lookup_key': lookup_key,
+        'transfer_lookup_key': True,
+        'product_data': {'name': product_name},
+    }
+    if interval:
+        params['recurring'] = {'interval': interval}
+    price = stripe.Price.create(**params)
+    return price.id
+
+
+def resolve_price(lookup_key, unit_amount, product_name, interval='month', currency='usd'):
+    """
+    Return the Stripe price id for lookup_key.
+    Served from process memory, then SQLite, and only goes to Stripe when the
+    cached entry is missing, stale or no longer matches the requested amount.
+    """
+    now = time.time()
+    cached = _prices.get(lookup_key)
+    if cached and cached[1] == unit_amount and cached[2] == interval and _is_fresh(cached[3], now):
+        return cached[0]
+
+    with _lock:
+        cached = _prices.get(lookup_key)
+        if cached and cached[1] == unit_amount and cached[2] == interval and _is_fresh(cached[3], now):
+            return cached[0]
+
+        row = db.session.get(StripePrice, lookup_key)
+        if row and row.unit_amount == unit_amount and row.interval == interval:
+            refreshed_at = row.refreshed_at.timestamp()
+            if _is_fresh(refreshed_at, now):
+                _prices[lookup_key] = (row.price_id, unit_amount, interval, refreshed_at)
+                return row.price_id
+
+        try:
+            price_id = _fetch_or_create(lookup_key, unit_amount, product_name, interval, currency)
+        except Exception as e:
+            # A stale but matching price is still usable while Stripe is unreachable
+            if row and row.unit_amount == unit_amount and row.interval == interval:
+                print(f"❌ Error refreshing Stripe price {lookup_key}, using cached price: {str(e)}")
+                return row.price_id
+            raise
+
+        if row is None:
+            row = StripePrice(lookup_key=lookup_key)
+            db.session.add(row)
+        row.price_id = price_id
+        row.unit_amount = unit_amount
+        row.currency = currency
+        row.interval = interval
+        row.refreshed_at = datetime.fromtimestamp(now)
+        db.session.commit()
+
+        _prices[lookup_key] = (price_id, unit_amount, interval, now)
+        return price_id
+
+
+def clear_cache():
+    """Forget in-process prices so the next lookup reads SQLite again"""
+    with _lock:
+        _prices.clear()
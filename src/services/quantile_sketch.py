@@ -0,0 +1,98 @@
+import math
+import random
+
+
+class KLLSketch:
+    """
+    KLL streaming quantile sketch (Karnin, Lang, Liberty 2016).
+    Holds about k / (1 - c) values (~600 at k=200) however many are added, with
+    rank error around 1%. Two sketches merge into one that summarizes both
+    streams, which is how per-worker updates are combined with the persisted copy.
+    """
+
+    def __init__(self, k=200, c=2 / 3):
+        self.k = k
+        self.c = c
+        self.levels = [[]]
+        self.n = 0
+        self.min = None
+        self.max = None
+        self._max_size = self._capacity(0)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(math.ceil(self.k * self.c ** depth)))
+
+    def _grow(self):
+        self.levels.append([])
+        self._max_size = sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def _compact(self, level):
+        """Halve a full level: sort, keep every other item (random offset), promote them with double weight"""
+        items = sorted(self.levels[level])
+        leftover = [items.pop()] if len(items) % 2 else []
+        offset = random.randint(0, 1)
+        self.levels[level] = leftover
+        self.levels[level + 1].extend(items[offset::2])
+
+    def _compress(self):
+        for level in range(len(self.levels)):
+            if len(self.levels[level]) >= self._capacity(level):
+                if level + 1 >= len(self.levels):
+                    self._grow()
+                self._compact(level)
+                if sum(len(items) for items in self.levels) < self._max_size:
+                    break
+
+    def update(self, value):
+        value = float(value)
+        self.levels[0].append(value)
+        self.n += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other):
+        """Fold another sketch's stream into this one"""
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q):
+        """Approximate value at rank q (0..1), or None for an empty sketch"""
+        if self.n == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        weighted = sorted((value, 2 ** level) for level, items in enumerate(self.levels) for value in items)
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        cumulative = 0
+        for value, weight in weighted:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return self.max
+
+    def to_dict(self):
+        return {'k': self.k, 'c': self.c, 'n': self.n, 'min': self.min, 'max': self.max, 'levels': self.levels}
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls(k=state['k'], c=state['c'])
+        sketch.levels = [list(items) for items in state['levels']] or [[]]
+        sketch.n = state['n']
+        sketch.min = state['min']
+        sketch.max = state['max']
+        sketch._max_size = sum(sketch._capacity(level) for level in range(len(sketch.levels)))
+        return sketch
@@ -0,0 +1,152 @@
+import json
+import math
+import os
+import threading
+
+from werkzeug.wsgi import ClosingIterator
+from src.services import background, local_store, metrics
+
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+RATE_LIMIT_WINDOW_SECONDS = int(os.environ.get('RATE_LIMIT_WINDOW_SECONDS', 60))
+# Requests per client IP per window; the endpoints that send email get much less
+RATE_LIMIT_DEFAULT = int(os.environ.get('RATE_LIMIT_DEFAULT', 300))
+RATE_LIMIT_ROI_CALCULATOR = int(os.environ.get('RATE_LIMIT_ROI_CALCULATOR', 10))
+RATE_LIMIT_TEST_EMAIL = int(os.environ.get('RATE_LIMIT_TEST_EMAIL', 3))
+
+# Concurrent /api requests this process accepts, and background tasks it lets pile up
+LOAD_SHED_MAX_IN_FLIGHT = int(os.environ.get('LOAD_SHED_MAX_IN_FLIGHT', 64))
+LOAD_SHED_MAX_QUEUE_DEPTH = int(os.environ.get('LOAD_SHED_MAX_QUEUE_DEPTH', 200))
+# Past this fraction of either limit, the expensive endpoints are shed first
+LOAD_SHED_EXPENSIVE_FRACTION = float(os.environ.get('LOAD_SHED_EXPENSIVE_FRACTION', 0.5))
+LOAD_SHED_RETRY_AFTER_SECONDS = int(os.environ.get('LOAD_SHED_RETRY_AFTER_SECONDS', 5))
+
+# Reverse proxies in front of the app that append to X-Forwarded-For (the hosting edge);
+# 0 means requests arrive directly and REMOTE_ADDR is the client
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', 1))
+
+API_PREFIX = '/api/'
+# (path, rule name, limit, expensive); paths not listed use the 'api' rule
+RULES = (
+    ('/api/roi-calculator', 'roi_calculator', RATE_LIMIT_ROI_CALCULATOR, True),
+    ('/api/test-email', 'test_email', RATE_LIMIT_TEST_EMAIL, True),
+)
+# Stripe signs its webhooks and retries on its own schedule; metrics must stay readable under load
+EXEMPT_PATHS = ('/api/webhook', '/api/metrics')
+
+_lock = threading.Lock()
+_in_flight = 0
+
+
+def client_ip(environ):
+    """
+    The client's address: the X-Forwarded-For entry appended by the outermost of our
+    TRUSTED_PROXY_COUNT proxies. Entries to the left of it come from the client and
+    are ignored, so a forged header cannot pick the key.
+    """
+    if TRUSTED_PROXY_COUNT > 0:
+        forwarded = [hop.strip() for hop in environ.get('HTTP_X_FORWARDED_FOR', '').split(',') if hop.strip()]
+        if len(forwarded) >= TRUSTED_PROXY_COUNT:
+            return forwarded[-TRUSTED_PROXY_COUNT]
+    return environ.get('REMOTE_ADDR') or ''
+
+
+def _rule(path):
+    for prefix, name, limit, expensive in RULES:
+        if path == prefix or path.startswith(prefix + '/'):
+            return name, limit, expensive
+    return 'api', RATE_LIMIT_DEFAULT, False
+
+
+def _retry_after_limit(limit, previous, current, elapsed):
+    """
+    Seconds until the client's next request would pass, assuming it stops sending:
+    previous * (1 - elapsed) + current + 1 must drop to the limit
+    """
+    if current + 1 <= limit and previous > 0:
+        needed = 1 - (limit - current - 1) / previous
+        if needed < 1:
+            return max(1, math.ceil((needed - elapsed) * RATE_LIMIT_WINDOW_SECONDS))
+    # Not within this window: wait for the next, where this window's count decays as the previous one
+    needed = max(0, 1 - (limit - 1) / current) if current else 0
+    return max(1, math.ceil((1 - elapsed + needed) * RATE_LIMIT_WINDOW_SECONDS))
+
+
+def _reject(start_response, status, retry_after, message, headers=()):
+    body = json.dumps({'success': False, 'error': message, 'retry_after': retry_after}).encode()
+    start_response(status, [
+        ('Content-Type', 'application/json'),
+        ('Content-Length', str(len(body))),
+        ('Retry-After', str(retry_after)),
+        # The app allows every origin; without this the browser hides the 429 from the page
+        ('Access-Control-Allow-Origin', '*'),
+        *headers
+    ])
+    return [body]
+
+
+def _shed_level():
+    """1.0 or more means saturated; compared against LOAD_SHED_EXPENSIVE_FRACTION for expensive routes"""
+    return max(_in_flight / LOAD_SHED_MAX_IN_FLIGHT, background.queue_depth() / LOAD_SHED_MAX_QUEUE_DEPTH)
+
+
+class RateLimitMiddleware:
+    """
+    WSGI middleware in front of the Flask app for /api requests. Runs before Flask
+    parses anything, so a rejected request costs a header read and one counter update:
+    - load shedding: 503 once this process is saturated (in-flight requests or
+      background queue depth), earlier for the endpoints that send email
+    - per-IP sliding-window limits shared by every worker on the host: 429
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        global _in_flight
+        path = environ.get('PATH_INFO', '')
+        if (not RATE_LIMIT_ENABLED or not path.startswith(API_PREFIX) or environ.get('REQUEST_METHOD') == 'OPTIONS'
+                or any(path == exempt or path.startswith(exempt + '/') for exempt in EXEMPT_PATHS)):
+            return self.wsgi_app(environ, start_response)
+
+        name, limit, expensive = _rule(path)
+
+        level = _shed_level()
+        if level >= 1 or (expensive and level >= LOAD_SHED_EXPENSIVE_FRACTION):
+            metrics.increment(f'load_shedding.shed.{name}')
+            return _reject(start_response, '503 Service Unavailable', LOAD_SHED_RETRY_AFTER_SECONDS,
+                           'Server is busy, please retry shortly')
+
+        try:
+            previous, current, elapsed = local_store.count_in_window(
+                f'rate:{name}:{client_ip(environ)}', RATE_LIMIT_WINDOW_SECONDS
+            )
+        except Exception as e:
+            # Fail open: a broken counter store must not take the API down with it
+            print(f"❌ Error updating rate limit counter: {str(e)}")
+        else:
+            if previous * (1 - elapsed) + current > limit:
+                metrics.increment(f'rate_limiter.rejected.{name}')
+                return _reject(
+                    start_response, '429 Too Many Requests', _retry_after_limit(limit, previous, current, elapsed),
+                    'Too many requests, please slow down', [('X-RateLimit-Limit', str(limit))]
+                )
+
+        with _lock:
+            _in_flight += 1
+
+        def done():
+            global _in_flight
+            with _lock:
+                _in_flight -= 1
+
+        try:
+            app_iter = self.wsgi_app(environ, start_response)
+        except BaseException:
+            done()
+            raise
+        # Streamed responses stay in flight until the server closes them
+        return ClosingIterator(app_iter, [done])
+
+
+metrics.register_gauge('load_shedding.in_flight', lambda: _in_flight)
+metrics.register_gauge('load_shedding.background_queue_depth', background.queue_depth)
@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+
+import numpy as np
+from src.services import lead_quantiles, metrics, rate_limiter
+
+# A submission scoring at least this much is treated as junk
+SPAM_SCORE_THRESHOLD = float(os.environ.get('SPAM_SCORE_THRESHOLD', 2))
+# Robust z-score beyond which an input is implausible for its category
+SPAM_ZSCORE_LIMIT = float(os.environ.get('SPAM_ZSCORE_LIMIT', 6))
+SPAM_IP_WINDOW_SECONDS = float(os.environ.get('SPAM_IP_WINDOW_SECONDS', 3600))
+SPAM_IP_MAX_SUBMISSIONS = int(os.environ.get('SPAM_IP_MAX_SUBMISSIONS', 5))
+SPAM_IP_TRACKED = int(os.environ.get('SPAM_IP_TRACKED', 50000))
+# Category norms are re-read from the quantile sketches at most this often
+SPAM_NORMS_TTL_SECONDS = float(os.environ.get('SPAM_NORMS_TTL_SECONDS', 30))
+# Opt-in: names of form fields hidden from people, so anything typed into them came
+# from a bot. Only list fields the served form really renders as hidden inputs.
+SPAM_HONEYPOT_FIELDS = tuple(
+    name.strip() for name in os.environ.get('SPAM_HONEYPOT_FIELDS', '').split(',') if name.strip()
+)
+
+# A filled honeypot is conclusive on its own; every other signal is soft and weighs
+# less than the threshold, so at least two of them have to agree
+WEIGHTS = {'honeypot': SPAM_SCORE_THRESHOLD, 'disposable_email': 1, 'ip_velocity': 1, 'outlier': 1}
+
+# Metrics compared with the category's live quantiles; revenue is compared on a log scale
+ZSCORE_METRICS = ('monthly_revenue', 'current_conversion_rate', 'cart_abandonment_rate')
+ZSCORE_LOG = np.array([True, False, False])
+# IQR of a normal distribution in standard deviations
+IQR_TO_SIGMA = 1.349
+
+DISPOSABLE_DOMAINS = frozenset({
+    '10minutemail.com', '20minutemail.com', 'anonbox.net', 'burnermail.io', 'discard.email',
+    'dispostable.com', 'dropmail.me', 'emailondeck.com', 'fakeinbox.com', 'getairmail.com',
+    'getnada.com', 'guerrillamail.biz', 'guerrillamail.com', 'guerrillamail.de', 'guerrillamail.info',
+    'guerrillamail.net', 'guerrillamail.org', 'guerrillamailblock.com', 'harakirimail.com',
+    'inboxkitten.com', 'mail.tm', 'mailcatch.com', 'maildrop.cc', 'mailinator.com', 'mailinator.net',
+    'mailnesia.com', 'mailpoof.com', 'mintemail.com', 'moakt.com', 'mohmal.com', 'mytemp.email',
+    'nada.email', 'sharklasers.com', 'spam4.me', 'spamgourmet.com', 'temp-mail.io', 'temp-mail.org',
+    'tempail.com', 'tempmail.dev', 'tempmail.net', 'tempmailo.com', 'tempr.email', 'throwawaymail.com',
+    'trashmail.com', 'trashmail.de', 'trashmail.net', 'yopmail.com', 'yopmail.fr', 'yopmail.net',
+}) | frozenset(
+    domain.strip().lower() for domain in os.environ.get('SPAM_DISPOSABLE_DOMAINS', '').split(',') if domain.strip()
+)
+
+Verdict = namedtuple('Verdict', ['flagged', 'score', 'reasons'])
+
+_lock = threading.Lock()
+_recent = OrderedDict()  # client ip -> deque of submission times, least recently seen first
+_norms = {}  # category -> (read at, lead_quantiles.summary())
+_stats = {'checked': 0, 'flagged': 0}
+
+
+def client_ip(request):
+    """The submitting client's address, as the rate limiter sees it"""
+    return rate_limiter.client_ip(request.environ)
+
+
+def _honeypot(data):
+    return [name for name in SPAM_HONEYPOT_FIELDS if str(data.get(name) or '').strip()]
+
+
+def _disposable(email):
+    domain = (email or '').rpartition('@')[2].strip().lower()
+    if not domain:
+        return False
+    # Subdomains of a throwaway service count too
+    parts = domain.split('.')
+    return any('.'.join(parts[i:]) in DISPOSABLE_DOMAINS for i in range(len(parts) - 1))
+
+
+def _velocity(ip, now):
+    """Record a submission from ip and return how many it made within the window"""
+    if not ip:
+        return 0
+    with _lock:
+        times = _recent.pop(ip, None) or deque()
+        while times and times[0] <= now - SPAM_IP_WINDOW_SECONDS:
+            times.popleft()
+        times.append(now)
+        _recent[ip] = times
+        while len(_recent) > SPAM_IP_TRACKED:
+            _recent.popitem(last=False)
+        return len(times)
+
+
+def _category_norms(category, now):
+    cached = _norms.get(category)
+    if cached is None or now - cached[0] > SPAM_NORMS_TTL_SECONDS:
+        cached = (now, lead_quantiles.summary(category))
+        if len(_norms) >= 1000:
+            _norms.clear()  # categories are free text; keep the cache bounded
+        _norms[category] = cached
+    return cached[1]
+
+
+def _outliers(business_category, values, now):
+    """
+    Metrics lying more than SPAM_ZSCORE_LIMIT robust standard deviations from the
+    category median. Norms come from the live quantile sketches and are only used
+    once a category has QUANTILE_MIN_SAMPLES submissions.
+    """
+    norms = _category_norms(business_category, now)
+    if not norms.get('monthly_revenue') or norms['monthly_revenue']['count'] < lead_quantiles.QUANTILE_MIN_SAMPLES:
+        norms = _category_norms(lead_quantiles.ALL_CATEGORIES, now)
+    names = [name for name in ZSCORE_METRICS if name in values and norms.get(name, {}).get('count', 0) >= lead_quantiles.QUANTILE_MIN_SAMPLES]
+    if not names:
+        return []
+
+    log_scale = np.array([ZSCORE_LOG[ZSCORE_METRICS.index(name)] for name in names])
+    observed = np.array([values[name] for name in names], dtype=np.float64)
+    quartiles = np.array([[norms[name]['p25'], norms[name]['p50'], norms[name]['p75']] for name in names], dtype=np.float64)
+    observed = np.where(log_scale, np.log1p(np.maximum(observed, 0)), observed)
+    quartiles = np.where(log_scale[:, None], np.log1p(np.maximum(quartiles, 0)), quartiles)
+
+    sigma = (quartiles[:, 2] - quartiles[:, 0]) / IQR_TO_SIGMA
+    sigma[sigma <= 0] = np.inf  # no spread to judge against
+    z = np.abs(observed - quartiles[:, 1]) / sigma
+    return [name for name, flagged in zip(names, z > SPAM_ZSCORE_LIMIT) if flagged]
+
+
+def check(data, email, ip, business_category, values, now=None):
+    """
+    Score a submission from cheap local signals only: honeypot fields, a disposable
+    email domain, repeat submissions from one IP and implausible numbers.
+    values holds the parsed metrics the form actually filled in.
+    """
+    now = time.time() if now is None else now
+    reasons = []
+    score = 0
+
+    trapped = _honeypot(data)
+    if trapped:
+        score += WEIGHTS['honeypot']
+        reasons.append(f"honeypot:{','.join(trapped)}")
+    if _disposable(email):
+        score += WEIGHTS['disposable_email']
+        reasons.append('disposable_email')
+    submissions = _velocity(ip, now)
+    if submissions > SPAM_IP_MAX_SUBMISSIONS:
+        score += WEIGHTS['ip_velocity']
+        reasons.append(f'ip_velocity:{submissions}')
+    # Percentages outside 0-100 are not a store, whatever the category
+    for name in ('current_conversion_rate', 'cart_abandonment_rate'):
+        if not 0 <= values.get(name, 0) <= 100:
+            score += WEIGHTS['outlier']
+            reasons.append(f'out_of_range:{name}')
+    for name in _outliers(business_category, values, now):
+        score += WEIGHTS['outlier']
+        reasons.append(f'outlier:{name}')
+
+    flagged = score >= SPAM_SCORE_THRESHOLD
+    with _lock:
+        _stats['checked'] += 1
+        _stats['flagged'] += int(flagged)
+    return Verdict(flagged, score, reasons)
+
+
+metrics.register_gauge('spam_filter.checked', lambda: _stats['checked'])
+metrics.register_gauge('spam_filter.flagged', lambda: _stats['flagged'])
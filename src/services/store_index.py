@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+from src.models.user import db
+from src.models.lead import Lead
+from src.services.kd_tree import KDTree
+
+STORE_INDEX_LEAF_SIZE = int(os.environ.get('STORE_INDEX_LEAF_SIZE', 128))
+# Rebuild once this many new submissions are waiting outside the tree, or on the timer
+STORE_INDEX_REBUILD_PENDING = int(os.environ.get('STORE_INDEX_REBUILD_PENDING', 500))
+STORE_INDEX_REBUILD_SECONDS = float(os.environ.get('STORE_INDEX_REBUILD_SECONDS', 300))
+
+FEATURES = ('monthly_revenue', 'average_order_value', 'monthly_orders', 'current_conversion_rate', 'cart_abandonment_rate')
+# Sizes span orders of magnitude, so they are compared on a log scale
+LOG_FEATURES = (True, True, True, False, False)
+
+# Everything a query needs, swapped in as one reference so readers never see a half-built index
+Snapshot = namedtuple('Snapshot', ['tree', 'mean', 'std', 'lead_ids', 'monthly_increase', 'max_lead_id'])
+
+_snapshot = Snapshot(KDTree(np.empty((0, len(FEATURES)))), np.zeros(len(FEATURES)), np.ones(len(FEATURES)),
+                     np.empty(0, dtype=np.int64), np.empty(0), 0)
+_pending_lock = threading.Lock()
+_pending = []  # (lead_id, raw feature vector, monthly_increase) stored since the snapshot was built
+_rebuild_lock = threading.Lock()
+_app = None
+
+
+def feature_vector(values):
+    """Raw features from a dict of inputs, or None unless all of them are positive"""
+    vector = [values.get(name) or 0 for name in FEATURES]
+    if any(value <= 0 for value in vector):
+        return None
+    return np.array(vector, dtype=np.float64)
+
+
+def _transform(raw):
+    return np.where(LOG_FEATURES, np.log1p(raw), raw)
+
+
+def add(lead_id, values, monthly_increase):
+    """Make a stored submission searchable right away; it joins the tree at the next rebuild"""
+    raw = feature_vector(values)
+    if raw is None:
+        return
+    with _pending_lock:
+        _pending.append((lead_id, raw, monthly_increase))
+        waiting = len(_pending)
+    if waiting >= STORE_INDEX_REBUILD_PENDING:
+        rebuild_in_background()
+
+
+def nearest(values, k=5):
+    """
+    The k stored submissions most similar to these inputs, nearest first:
+    [{'lead_id', 'distance', 'monthly_increase'}]. Empty if the inputs are incomplete.
+    """
+    raw = feature_vector(values)
+    if raw is None:
+        return []
+    snapshot = _snapshot
+    point = (_transform(raw) - snapshot.mean) / snapshot.std
+    distances, positions = snapshot.tree.query(point, k)
+    found = [
+        (float(distance), int(snapshot.lead_ids[position]), float(snapshot.monthly_increase[position]))
+        for distance, position in zip(distances, positions)
+    ]
+
+    # Submissions newer than the tree: a brute-force scan over a short list
+    with _pending_lock:
+        pending = [item for item in _pending if item[0] > snapshot.max_lead_id]
+    if pending:
+        vectors = (_transform(np.array([item[1] for item in pending])) - snapshot.mean) / snapshot.std
+        pending_distances = ((vectors - point) ** 2).sum(axis=1)
+        found.extend(
+            (float(distance), item[0], float(item[2]))
+            for distance, item in zip(pending_distances, pending)
+        )
+        found.sort()
+
+    return [
+        {'lead_id': lead_id, 'distance': round(distance ** 0.5, 4), 'monthly_increase': monthly_increase}
+        for distance, lead_id, monthly_increase in found[:k]
+    ]
+
+
+def rebuild():
+    """Build a fresh tree from the stored leads and swap it in (call inside an app context)"""
+    global _snapshot
+    with _rebuild_lock:
+        started = time.perf_counter()
+        rows = db.session.query(
+            Lead.id, *[getattr(Lead, name) for name in FEATURES], Lead.roi_data
+        ).filter(
+            Lead.flagged_as_spam.isnot(True), *[getattr(Lead, name) > 0 for name in FEATURES]
+        ).order_by(Lead.id).all()
+
+        lead_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        raw = np.array([row[1:1 + len(FEATURES)] for row in rows], dtype=np.float64).reshape(-1, len(FEATURES))
+        monthly_increase = np.array([(row[-1] or {}).get('monthly_increase', 0) for row in rows], dtype=np.float64)
+
+        transformed = _transform(raw)
+        mean = transformed.mean(axis=0) if len(rows) else np.zeros(len(FEATURES))
+        std = transformed.std(axis=0) if len(rows) else np.ones(len(FEATURES))
+        std[std == 0] = 1
+        max_lead_id = int(lead_ids[-1]) if len(rows) else 0
+
+        _snapshot = Snapshot(
+            KDTree((transformed - mean) / std, STORE_INDEX_LEAF_SIZE),
+            mean, std, lead_ids, monthly_increase, max_lead_id
+        )
+        with _pending_lock:
+            _pending[:] = [item for item in _pending if item[0] > max_lead_id]
+        print(f"✅ Store index rebuilt over {len(rows)} submissions in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+
+def rebuild_in_background():
+    if _app is None or _rebuild_lock.locked():
+        return
+
+    def run():
+        try:
+            with _app.app_context():
+                rebuild()
+        except Exception as e:
+            print(f"❌ Error rebuilding store index: {str(e)}")
+
+    threading.Thread(target=run, name='store-index-rebuild', daemon=True).start()
+
+
+def start(app):
+    """Build the index in the background now and again every STORE_INDEX_REBUILD_SECONDS"""
+    global _app
+    if _app is not None:
+        return
+    _app = app
+
+    def loop():
+        while True:
+            rebuild_in_background()
+            time.sleep(STORE_INDEX_REBUILD_SECONDS)
+
+    threading.Thread(target=loop, name='store-index-timer', daemon=True).start()
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+
+import requests
+import stripe
+from requests.adapters import HTTPAdapter
+from src.services import metrics
+
+STRIPE_CONNECT_TIMEOUT_SECONDS = float(os.environ.get('STRIPE_CONNECT_TIMEOUT_SECONDS', 3.05))
+STRIPE_READ_TIMEOUT_SECONDS = float(os.environ.get('STRIPE_READ_TIMEOUT_SECONDS', 30))
+STRIPE_MAX_NETWORK_RETRIES = int(os.environ.get('STRIPE_MAX_NETWORK_RETRIES', 2))
+STRIPE_POOL_MAXSIZE = int(os.environ.get('STRIPE_POOL_MAXSIZE', 16))
+
+_session = None
+_lock = threading.Lock()
+
+
+class InstrumentedRequestsClient(stripe.RequestsClient):
+    """Stripe's requests client, timing every attempt (retries included) into the metrics registry"""
+
+    def request(self, method, url, headers, post_data=None):
+        started = time.perf_counter()
+        try:
+            return super().request(method, url, headers, post_data)
+        except Exception:
+            metrics.increment('stripe.request_errors')
+            raise
+        finally:
+            metrics.observe('stripe.request', time.perf_counter() - started)
+
+
+def _pool_totals():
+    """(connections opened, requests sent) across the urllib3 pools behind the shared session"""
+    connections = 0
+    sent = 0
+    for adapter in set(_session.adapters.values()):  # one adapter is mounted for both schemes
+        for key in adapter.poolmanager.pools.keys():
+            pool = adapter.poolmanager.pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                sent += pool.num_requests
+    return connections, sent
+
+
+def _connection_reuse_rate():
+    connections, sent = _pool_totals()
+    return round(1 - connections / sent, 4) if sent else None
+
+
+def configure():
+    """
+    Point the stripe SDK at one keep-alive connection pool shared by every thread.
+    Without this the SDK opens a separate requests.Session per thread.
+    """
+    global _session
+    with _lock:
+        if _session is not None:
+            return
+
+        session = requests.Session()
+        # Retries are left to the SDK (max_network_retries), which also handles idempotency keys
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=STRIPE_POOL_MAXSIZE, max_retries=0)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+
+        stripe.default_http_client = InstrumentedRequestsClient(
+            timeout=(STRIPE_CONNECT_TIMEOUT_SECONDS, STRIPE_READ_TIMEOUT_SECONDS),
+            session=session
+        )
+        stripe.max_network_retries = STRIPE_MAX_NETWORK_RETRIES
+
+    metrics.register_gauge('stripe.connections_opened', lambda: _pool_totals()[0])
+    metrics.register_gauge('stripe.pool_requests', lambda: _pool_totals()[1])
+    metrics.register_gauge('stripe.connection_reuse_rate', _connection_reuse_rate)
+
+
+def warm_up():
+    """Open the first connection (DNS, TCP, TLS) before a customer request has to"""
+    configure()
+    started = time.perf_counter()
+    try:
+        # Same verify bundle as the SDK, otherwise urllib3 keys the connection to a different pool
+        _session.head(
+            stripe.api_base,
+            verify=stripe.ca_bundle_path,
+            timeout=(STRIPE_CONNECT_TIMEOUT_SECONDS, STRIPE_READ_TIMEOUT_SECONDS)
+        )
+        print(f"✅ Stripe connection warmed in {(time.perf_counter() - started) * 1000:.0f}ms")
+    except Exception as e:
+        print(f"❌ Could not warm Stripe connection: {str(e)}")
@@ -0,0 +1,145 @@
+import time
+from datetime import datetime
+
+from src.models.user import db
+from src.models.billing import StripeCustomer, StripeSubscription, StripePaymentIntent, StripeInvoice
+from src.services.webhook_dispatch import handles_event
+
+
+def _to_datetime(timestamp):
+    return datetime.utcfromtimestamp(timestamp) if timestamp else None
+
+
+def _plain(value):
+    """StripeObject metadata -> plain dict for JSON columns"""
+    return {key: value[key] for key in value} if value else {}
+
+
+def _customer_fields(customer):
+    return {
+        'email': customer.get('email'),
+        'name': customer.get('name'),
+        'metadata_json': _plain(customer.get('metadata')),
+        'deleted': bool(customer.get('deleted')),
+        'created': _to_datetime(customer.get('created')),
+    }
+
+
+def _subscription_fields(subscription):
+    items = (subscription.get('items') or {}).get('data') or []
+    price = (items[0].get('price') or {}) if items else {}
+    metadata = _plain(subscription.get('metadata'))
+    return {
+        'customer_id': subscription.get('customer'),
+        'status': subscription.get('status'),
+        'plan': metadata.get('plan'),
+        'price_id': price.get('id'),
+        'unit_amount': price.get('unit_amount'),
+        'cancel_at_period_end': bool(subscription.get('cancel_at_period_end')),
+        'current_period_end': _to_datetime(subscription.get('current_period_end')),
+        'trial_end': _to_datetime(subscription.get('trial_end')),
+        'metadata_json': metadata,
+        'created': _to_datetime(subscription.get('created')),
+    }
+
+
+def _payment_intent_fields(payment_intent):
+    return {
+        'customer_id': payment_intent.get('customer'),
+        'status': payment_intent.get('status'),
+        'amount': payment_intent.get('amount'),
+        'currency': payment_intent.get('currency'),
+        'description': payment_intent.get('description'),
+        'metadata_json': _plain(payment_intent.get('metadata')),
+        'created': _to_datetime(payment_intent.get('created')),
+    }
+
+
+def _invoice_fields(invoice):
+    return {
+        'customer_id': invoice.get('customer'),
+        'subscription_id': invoice.get('subscription'),
+        'status': invoice.get('status'),
+        'amount_due': invoice.get('amount_due'),
+        'amount_paid': invoice.get('amount_paid'),
+        'currency': invoice.get('currency'),
+        'created': _to_datetime(invoice.get('created')),
+    }
+
+
+MIRRORS = {
+    'customer': (StripeCustomer, _customer_fields),
+    'subscription': (StripeSubscription, _subscription_fields),
+    'payment_intent': (StripePaymentIntent, _payment_intent_fields),
+    'invoice': (StripeInvoice, _invoice_fields),
+}
+
+
+def upsert(obj, synced_at=None, commit=True):
+    """
+    Write a Stripe object into its mirror table.
+    synced_at is the Stripe timestamp the data is from (the event's created time);
+    older data never overwrites newer data, so out-of-order webhooks are harmless.
+    """
+    model, fields = MIRRORS[obj['object']]
+    synced_at = int(synced_at or time.time())
+
+    row = db.session.get(model, obj['id'])
+    if row is None:
+        row = model(id=obj['id'])
+        db.session.add(row)
+    elif row.synced_at > synced_at:
+        return row
+
+    for name, value in fields(obj).items():
+        setattr(row, name, value)
+    row.synced_at = synced_at
+    if commit:
+        db.session.commit()
+    return row
+
+
+@handles_event('customer.created', 'customer.updated', 'customer.deleted')
+def mirror_customer(event):
+    customer = event['data']['object']
+    if event['type'] == 'customer.deleted':
+        customer = dict(customer, deleted=True)
+    upsert(customer, event.get('created'))
+
+
+@handles_event(
+    'customer.subscription.created',
+    'customer.subscription.updated',
+    'customer.subscription.deleted',
+    'customer.subscription.paused',
+    'customer.subscription.resumed',
+    'customer.subscription.trial_will_end'
+)
+def mirror_subscription(event):
+    upsert(event['data']['object'], event.get('created'))
+
+
+@handles_event(
+    'payment_intent.created',
+    'payment_intent.processing',
+    'payment_intent.requires_action',
+    'payment_intent.succeeded',
+    'payment_intent.payment_failed',
+    'payment_intent.canceled'
+)
+def mirror_payment_intent(event):
+    upsert(event['data']['object'], event.get('created'))
+
+
+@handles_event(
+    'invoice.created',
+    'invoice.finalized',
+    'invoice.updated',
+    'invoice.paid',
+    'invoice.payment_succeeded',
+    'invoice.payment_failed',
+    'invoice.voided',
+    'invoice.marked_uncollectible'
+)
+def mirror_invoice(event):
+    upsert(event['data']['object'], event.get('created'))
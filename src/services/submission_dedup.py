@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, null, select, update
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.lead import RecentSubmission
+from src.services import metrics
+
+# Identical submissions from the same email within this window get the first response back
+ROI_DUPLICATE_WINDOW_SECONDS = float(os.environ.get('ROI_DUPLICATE_WINDOW_SECONDS', 600))
+ROI_DUPLICATE_CACHE_SIZE = int(os.environ.get('ROI_DUPLICATE_CACHE_SIZE', 2000))
+# How long a repeat waits for the first copy to finish before being processed itself
+ROI_DUPLICATE_WAIT_SECONDS = float(os.environ.get('ROI_DUPLICATE_WAIT_SECONDS', 20))
+POLL_SECONDS = 0.1
+
+_lock = threading.Lock()
+_responses = OrderedDict()  # fingerprint -> (completed at, response), oldest first
+_in_flight = {}  # fingerprint -> (claim token, threading.Event set when this worker finishes it)
+_claims_since_purge = 0
+_stats = {'coalesced': 0}
+
+
+def _normalize(value):
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (list, tuple)):
+        return sorted(json.dumps(_normalize(item), sort_keys=True) for item in value)
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    text = str(value).strip()
+    try:
+        return round(float(text), 4)
+    except ValueError:
+        return '' if text == 'undefined' else text.lower()
+
+
+def fingerprint(data):
+    """
+    sha256 over the email and every non-empty field, normalized so that '5000', 5000
+    and 5000.0, letter case, surrounding spaces and checkbox order all compare equal
+    """
+    if not isinstance(data, dict):
+        return None
+    normalized = {key: _normalize(value) for key, value in data.items()}
+    normalized = {key: value for key, value in normalized.items() if value not in (None, '', [])}
+    normalized['email'] = str(data.get('email') or '').strip().lower()
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+def _remember(submission, completed_at, response):
+    with _lock:
+        _responses[submission] = (completed_at, response)
+        _responses.move_to_end(submission)
+        while len(_responses) > ROI_DUPLICATE_CACHE_SIZE:
+            _responses.popitem(last=False)
+
+
+def _cached(submission, now):
+    with _lock:
+        cached = _responses.get(submission)
+    if cached is not None and now - cached[0] <= ROI_DUPLICATE_WINDOW_SECONDS:
+        return cached[1]
+    return None
+
+
+def _purge_expired():
+    global _claims_since_purge
+    _claims_since_purge += 1
+    if _claims_since_purge >= 100:
+        _claims_since_purge = 0
+        cutoff = datetime.utcnow() - timedelta(seconds=ROI_DUPLICATE_WINDOW_SECONDS)
+        db.session.execute(delete(RecentSubmission).where(RecentSubmission.created_at < cutoff))
+        db.session.commit()
+
+
+def _try_claim(submission, token):
+    """Insert the in-flight row under token, or take over an expired one; (claimed, existing response)"""
+    now = datetime.utcnow()
+    try:
+        db.session.execute(insert(RecentSubmission).values(fingerprint=submission, created_at=now, claim_token=token))
+        db.session.commit()
+        return True, None
+    except IntegrityError:
+        db.session.rollback()
+
+    row = db.session.execute(
+        select(RecentSubmission.response, RecentSubmission.created_at).where(RecentSubmission.fingerprint == submission)
+    ).first()
+    db.session.commit()  # end the read so the next poll sees other workers' writes
+    if row is None:
+        return _try_claim(submission, token)
+    if row.created_at < now - timedelta(seconds=ROI_DUPLICATE_WINDOW_SECONDS):
+        # Outside the window: start over, unless another repeat just did
+        taken = db.session.execute(
+            update(RecentSubmission)
+            .where(RecentSubmission.fingerprint == submission, RecentSubmission.created_at == row.created_at)
+            .values(response=null(), created_at=now, claim_token=token)
+        ).rowcount
+        db.session.commit()
+        return bool(taken), None
+    return False, row.response
+
+
+def claim(submission):
+    """
+    Returns (earlier response, None) if this submission is a repeat within the window,
+    waiting for it if the first copy is still being processed. Otherwise returns
+    (None, claim token): with a token the caller owns the submission and must pass it
+    to complete() or release(). A repeat that gives up waiting gets (None, None) and is
+    processed without touching the first copy's claim.
+    Call inside an app context.
+    """
+    if submission is None:
+        return None, None
+    deadline = time.time() + ROI_DUPLICATE_WAIT_SECONDS
+
+    while True:
+        response = _cached(submission, time.time())
+        if response is not None:
+            break
+        token = uuid.uuid4().hex
+        with _lock:
+            holder = _in_flight.get(submission)
+            if holder is None:
+                _in_flight[submission] = (token, threading.Event())
+        if holder is not None:
+            # Another request in this worker has it: no need to poll the database
+            if holder[1].wait(max(deadline - time.time(), 0)):
+                continue
+            return None, None
+
+        try:
+            claimed, response = _try_claim(submission, token)
+        except Exception as e:
+            db.session.rollback()
+            _finish(submission, token)
+            print(f"❌ Error checking for duplicate submission: {str(e)}")
+            return None, None
+        if claimed:
+            try:
+                _purge_expired()
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Error purging expired submissions: {str(e)}")
+            return None, token
+        _finish(submission, token)
+        if response is not None:
+            _remember(submission, time.time(), response)
+            break
+
+        # Still in flight in another worker
+        if time.time() >= deadline:
+            print("❌ Gave up waiting for the first copy of a duplicate submission; processing it again")
+            return None, None
+        time.sleep(POLL_SECONDS)
+
+    with _lock:
+        _stats['coalesced'] += 1
+    return response, None
+
+
+def _finish(submission, token):
+    """Wake this worker's waiters, unless another claim has replaced ours"""
+    with _lock:
+        holder = _in_flight.get(submission)
+        if holder is None or holder[0] != token:
+            return
+        del _in_flight[submission]
+    holder[1].set()
+
+
+def complete(submission, token, response):
+    """Store the response a claimed submission got, for repeats to reuse"""
+    if submission is None or token is None:
+        return
+    _remember(submission, time.time(), response)
+    try:
+        db.session.execute(
+            update(RecentSubmission)
+            .where(RecentSubmission.fingerprint == submission, RecentSubmission.claim_token == token)
+            .values(response=response)
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error storing submission response: {str(e)}")
+    _finish(submission, token)
+
+
+def release(submission, token):
+    """Give up a claim after a failure so a retry is processed normally"""
+    if submission is None or token is None:
+        return
+    try:
+        db.session.execute(
+            delete(RecentSubmission).where(
+                RecentSubmission.fingerprint == submission,
+                RecentSubmission.claim_token == token,
+                RecentSubmission.response.is_(None)
+            )
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Error releasing submission claim: {str(e)}")
+    _finish(submission, token)
+
+
+metrics.register_gauge('roi_submissions.coalesced', lambda: _stats['coalesced'])
@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from src.services import local_store, metrics
+
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 10000))
+# Upper bound on how stale an entry can get when an invalidation never arrives
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', 30))
+# Also tell the other worker processes on this host, through the local store.
+# On by default whenever more than one worker is configured.
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+USER_CACHE_SHARED_INVALIDATION = os.environ.get(
+    'USER_CACHE_SHARED_INVALIDATION', 'true' if WEB_CONCURRENCY > 1 else ''
+).lower() in ('1', 'true', 'yes')
+USER_CACHE_INVALIDATION_POLL_SECONDS = float(os.environ.get('USER_CACHE_INVALIDATION_POLL_SECONDS', 0.5))
+
+INVALIDATION_CHANNEL = 'user_cache'
+
+_lock = threading.Lock()
+_lru = OrderedDict()  # user id -> ({'id', 'username', 'email', 'version'}, expires at)
+_generation = 0  # bumped by every invalidation
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def get(user_id):
+    """The cached row for a user, or None"""
+    with _lock:
+        entry = _lru.get(user_id)
+        if entry is not None and entry[1] <= time.monotonic():
+            del _lru[user_id]
+            entry = None
+        if entry is None:
+            _stats['misses'] += 1
+            return None
+        _lru.move_to_end(user_id)
+        _stats['hits'] += 1
+        return entry[0]
+
+
+def generation():
+    """Take this before reading the database and hand it to put()"""
+    return _generation
+
+
+def put(user_id, row, read_generation):
+    """
+    Cache a row read from the database. Skipped if anything was invalidated since
+    read_generation, since the row may predate that write.
+    """
+    with _lock:
+        if read_generation != _generation:
+            return
+        _lru[user_id] = (row, time.monotonic() + USER_CACHE_TTL_SECONDS)
+        _lru.move_to_end(user_id)
+        while len(_lru) > USER_CACHE_SIZE:
+            _lru.popitem(last=False)
+            _stats['evictions'] += 1
+
+
+def _evict(user_ids):
+    global _generation
+    with _lock:
+        _generation += 1
+        for user_id in user_ids:
+            _lru.pop(user_id, None)
+
+
+def invalidate(*user_ids):
+    """Drop users after a write, here and (if enabled) in the other workers"""
+    _evict(user_ids)
+    if USER_CACHE_SHARED_INVALIDATION and user_ids:
+        try:
+            local_store.publish(INVALIDATION_CHANNEL, ','.join(str(user_id) for user_id in user_ids))
+        except Exception as e:
+            print(f"❌ Error publishing user cache invalidation: {str(e)}")
+
+
+def _hit_ratio():
+    lookups = _stats['hits'] + _stats['misses']
+    return round(_stats['hits'] / lookups, 4) if lookups else None
+
+
+def start_invalidation_listener():
+    """Apply invalidations published by other workers (no-op unless USER_CACHE_SHARED_INVALIDATION is on)"""
+    if USER_CACHE_SHARED_INVALIDATION:
+        local_store.subscribe(
+            INVALIDATION_CHANNEL,
+            lambda message: _evict([int(user_id) for user_id in message.split(',')]),
+            USER_CACHE_INVALIDATION_POLL_SECONDS
+        )
+
+
+metrics.register_gauge('user_cache.hits', lambda: _stats['hits'])
+metrics.register_gauge('user_cache.misses', lambda: _stats['misses'])
+metrics.register_gauge('user_cache.evictions', lambda: _stats['evictions'])
+metrics.register_gauge('user_cache.hit_ratio', _hit_ratio)
+metrics.register_gauge('user_cache.size', lambda: len(_lru))
@@ -0,0 +1,28 @@
+# Registry of Stripe webhook handlers, keyed by event type. An event type can
+# have several handlers; they run in registration order.
+_handlers = {}
+
+
+def handles_event(*event_types):
+    """Register the decorated function as a handler for one or more Stripe event types"""
+    def decorator(handler):
+        for event_type in event_types:
+            handlers = _handlers.setdefault(event_type, [])
+            if handler not in handlers:
+                handlers.append(handler)
+        return handler
+    return decorator
+
+
+def handled_event_types():
+    return sorted(_handlers)
+
+
+def dispatch_event(event):
+    """Run every handler registered for the event's type; returns False if there are none"""
+    handlers = _handlers.get(event['type'])
+    if not handlers:
+        return False
+    for handler in handlers:
+        handler(event)
+    return True
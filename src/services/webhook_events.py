@@ -0,0 +1,163 @@
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.billing import StripeEvent
+from src.services.webhook_dispatch import dispatch_event
+
+WEBHOOK_WORKERS = int(os.environ.get('WEBHOOK_WORKERS', 1))
+WEBHOOK_MAX_ATTEMPTS = int(os.environ.get('WEBHOOK_MAX_ATTEMPTS', 5))
+WEBHOOK_RETRY_DELAY_SECONDS = float(os.environ.get('WEBHOOK_RETRY_DELAY_SECONDS', 30))
+# An event still processing after this long is taken to belong to a dead worker and is requeued.
+# Keep it well above the slowest handler, or a live worker's event would run twice.
+WEBHOOK_LEASE_SECONDS = float(os.environ.get('WEBHOOK_LEASE_SECONDS', 300))
+WEBHOOK_LEASE_SWEEP_SECONDS = float(os.environ.get('WEBHOOK_LEASE_SWEEP_SECONDS', 60))
+
+_queue = queue.Queue()
+_app = None
+_threads = []
+
+
+def record_event(event_id, event_type, payload):
+    """
+    Persist a verified webhook event and queue it for processing.
+    Returns False for a redelivery: the primary key on the event id drops it at insert time.
+    """
+    db.session.add(StripeEvent(id=event_id, type=event_type, payload=payload))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return False
+    _queue.put(event_id)
+    return True
+
+
+def queue_depth():
+    return _queue.qsize()
+
+
+def _claim(event_id):
+    """Move a pending event to processing; False if another worker already has it"""
+    claimed = StripeEvent.query.filter_by(id=event_id, status='pending').update(
+        {'status': 'processing', 'attempts': StripeEvent.attempts + 1, 'claimed_at': datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    return claimed == 1
+
+
+def process_stored_event(event_id):
+    """
+    Dispatch one stored event to its handler and record the outcome.
+    Returns whether a handler was registered, or None if the event was not claimed.
+    """
+    if not _claim(event_id):
+        return None
+
+    row = db.session.get(StripeEvent, event_id)
+    try:
+        handled = dispatch_event(json.loads(row.payload))
+    except Exception as e:
+        db.session.rollback()
+        row = db.session.get(StripeEvent, event_id)
+        row.last_error = str(e)
+        if row.attempts >= WEBHOOK_MAX_ATTEMPTS:
+            row.status = 'failed'
+            print(f"❌ Giving up on Stripe event {event_id} after {row.attempts} attempts: {str(e)}")
+        else:
+            row.status = 'pending'
+            print(f"❌ Error processing Stripe event {event_id}, will retry: {str(e)}")
+            timer = threading.Timer(WEBHOOK_RETRY_DELAY_SECONDS, _queue.put, args=(event_id,))
+            timer.daemon = True
+            timer.start()
+        db.session.commit()
+        return None
+
+    row.status = 'processed'
+    row.processed_at = datetime.utcnow()
+    row.last_error = None
+    db.session.commit()
+    return handled
+
+
+def requeue_expired_leases():
+    """
+    Return events whose worker died mid-processing (crash, deploy restart) to pending
+    and queue them again, or fail them once they are out of attempts. Call inside an
+    app context; returns how many were requeued.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=WEBHOOK_LEASE_SECONDS)
+    expired = db.session.query(StripeEvent.id, StripeEvent.attempts).filter(
+        StripeEvent.status == 'processing',
+        db.or_(StripeEvent.claimed_at.is_(None), StripeEvent.claimed_at < cutoff)
+    ).all()
+
+    requeued = 0
+    for event_id, attempts in expired:
+        status = 'failed' if attempts >= WEBHOOK_MAX_ATTEMPTS else 'pending'
+        # Conditional on the lease still being expired, so only one sweeper takes it
+        taken = StripeEvent.query.filter(
+            StripeEvent.id == event_id,
+            StripeEvent.status == 'processing',
+            db.or_(StripeEvent.claimed_at.is_(None), StripeEvent.claimed_at < cutoff)
+        ).update({'status': status, 'last_error': 'Processing lease expired'}, synchronize_session=False)
+        db.session.commit()
+        if not taken:
+            continue
+        if status == 'failed':
+            print(f"❌ Giving up on Stripe event {event_id} after {attempts} attempts: processing lease expired")
+        else:
+            print(f"❌ Stripe event {event_id} was left processing by a stopped worker, requeueing")
+            _queue.put(event_id)
+            requeued += 1
+    return requeued
+
+
+def _sweep_loop():
+    while True:
+        time.sleep(WEBHOOK_LEASE_SWEEP_SECONDS)
+        try:
+            with _app.app_context():
+                requeue_expired_leases()
+        except Exception as e:
+            print(f"❌ Error requeueing expired webhook events: {str(e)}")
+
+
+def _worker_loop():
+    while True:
+        event_id = _queue.get()
+        try:
+            with _app.app_context():
+                process_stored_event(event_id)
+        except Exception as e:
+            print(f"❌ Webhook worker error on {event_id}: {str(e)}")
+        finally:
+            _queue.task_done()
+
+
+def start_workers(app):
+    """
+    Start the background webhook workers, requeue events left pending or half-processed
+    by a restart, and keep sweeping for expired processing leases
+    """
+    global _app
+    started = _app is not None
+    _app = app
+
+    with app.app_context():
+        for (event_id,) in db.session.query(StripeEvent.id).filter_by(status='pending').order_by(StripeEvent.received_at):
+            _queue.put(event_id)
+        requeue_expired_leases()
+
+    while len(_threads) < WEBHOOK_WORKERS:
+        thread = threading.Thread(target=_worker_loop, name=f"webhook-worker-{len(_threads)}", daemon=True)
+        thread.start()
+        _threads.append(thread)
+    if not started:
+        threading.Thread(target=_sweep_loop, name='webhook-lease-sweeper', daemon=True).start()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Concurrent-write benchmark for the SQLite setup, one OS process per worker.
+
+    python src/tools/bench_db_writes.py --workers 8 --writes 300
+    python src/tools/bench_db_writes.py --workers 8 --writes 300 --untuned
+
+Each worker behaves like an app process: a small transaction inserting a user,
+then a read of the latest page, repeated. --untuned uses a plain engine
+(rollback journal, synchronous=FULL, pysqlite's default lock wait) to show the
+"before" numbers; the default goes through src/database/engine.py.
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from bench_support import summarize
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.exc import OperationalError
+from src.database import engine as database
+from src.models.user import User
+
+
+def make_engine(uri, tuned):
+    if not tuned:
+        # pysqlite's default lock wait is 5s; the old app never changed it
+        return create_engine(uri)
+    bound = create_engine(uri, **database.engine_options(uri))
+    database.install_sqlite_pragmas(bound)
+    return bound
+
+
+def worker(uri, tuned, worker_id, writes, results):
+    bound = make_engine(uri, tuned)
+    durations = []
+    locked = 0
+    for n in range(writes):
+        started = time.perf_counter()
+        try:
+            with bound.begin() as connection:
+                connection.execute(insert(User).values(username=f'w{worker_id}-{n}', email=f'w{worker_id}-{n}@bench.local'))
+            with bound.connect() as connection:
+                connection.execute(select(User.id, User.email).order_by(User.id.desc()).limit(20)).all()
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+        durations.append(time.perf_counter() - started)
+    results.put((durations, locked))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--writes', type=int, default=300, help='transactions per worker')
+    parser.add_argument('--untuned', action='store_true', help='plain engine without the pragmas')
+    args = parser.parse_args()
+
+    handle, path = tempfile.mkstemp(suffix='.db', prefix='bench-writes-')
+    os.close(handle)
+    uri = f"sqlite:///{path}"
+    tuned = not args.untuned
+    setup = make_engine(uri, tuned)
+    User.__table__.create(setup)
+    setup.dispose()
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker, args=(uri, tuned, worker_id, args.writes, results))
+        for worker_id in range(args.workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+
+    durations = [d for worker_durations, _ in collected for d in worker_durations]
+    locked = sum(worker_locked for _, worker_locked in collected)
+    total = args.workers * args.writes
+    print(f"{'tuned' if tuned else 'untuned'}: {args.workers} workers x {args.writes} transactions")
+    summarize('write + read', durations)
+    print(f"throughput: {(total - locked) / elapsed:.1f} committed/s  'database is locked': {locked}")
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Measure /api/create-payment-intent latency against the provider stand-in.
+
+    python src/tools/provider_standin.py --latency-ms 40 &
+    STRIPE_API_BASE=http://127.0.0.1:12111 STRIPE_SECRET_KEY=sk_test_standin \
+        python src/tools/bench_payment_intent.py --requests 50
+
+Every request uses a fresh email, so each one creates a customer, a payment
+intent and a subscription on the stand-in.
+"""
+import argparse
+import time
+import uuid
+
+from bench_support import make_app, summarize
+from src.routes.payment import payment_bp
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--plan', default='professional')
+    args = parser.parse_args()
+
+    app = make_app(payment_bp)
+    client = app.test_client()
+
+    # Warm the price catalog so every measured request sees the steady state
+    client.post('/api/create-payment-intent', json={'email': f'warm-{uuid.uuid4().hex}@bench.local',
+                                                     'name': 'Warm Up', 'plan': args.plan})
+
+    durations = []
+    failures = 0
+    for _ in range(args.requests):
+        payload = {'email': f'{uuid.uuid4().hex}@bench.local', 'name': 'Bench Buyer', 'plan': args.plan}
+        started = time.perf_counter()
+        response = client.post('/api/create-payment-intent', json=payload)
+        durations.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            failures += 1
+
+    summarize('create-payment-intent', durations)
+    print(f"failures: {failures}")
+
+
+if __name__ == '__main__':
+    main()
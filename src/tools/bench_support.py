@@ -0,0 +1,38 @@
+import os
+import sys
+import tempfile
+# Make `src` importable when a tool is run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from flask import Flask
+from src.database import engine
+
+
+def make_app(*blueprints, database_uri=None):
+    """Minimal app with the given blueprints under /api and a throwaway SQLite database"""
+    app = Flask(__name__)
+    if database_uri is None:
+        handle, path = tempfile.mkstemp(suffix='.db', prefix='bench-')
+        os.close(handle)
+        database_uri = f"sqlite:///{path}"
+    engine.configure(app, database_uri)
+    for blueprint in blueprints:
+        app.register_blueprint(blueprint, url_prefix='/api')
+    with app.app_context():
+        engine.ensure_schema()
+    return app
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(label, seconds):
+    """Print count, mean, p50, p95 and p99 of a list of durations in seconds"""
+    values = sorted(s * 1000 for s in seconds)
+    mean = sum(values) / len(values) if values else 0.0
+    print(f"{label}: n={len(values)} mean={mean:.2f}ms p50={percentile(values, 0.5):.2f}ms "
+          f"p95={percentile(values, 0.95):.2f}ms p99={percentile(values, 0.99):.2f}ms")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Measure GET /api/users page latency at different depths of a large user table.
+
+    python src/tools/bench_users.py --rows 1000000 --limit 100
+
+Seeds the table with executemany inserts (skipped when --database-uri points at
+an already seeded file), then times the first page, a page in the middle and the
+last page via ?after_id=. With keyset pagination all three should cost the same.
+--full also times the old unpaginated query for comparison.
+"""
+import argparse
+import time
+
+from bench_support import make_app, summarize
+from sqlalchemy import func, insert
+from src.models.user import User, db
+from src.routes.user import user_bp
+
+
+def seed(rows, batch_size=50000):
+    existing = db.session.query(func.count(User.id)).scalar()
+    for start in range(existing, rows, batch_size):
+        stop = min(rows, start + batch_size)
+        db.session.execute(insert(User), [
+            {'username': f'user{n}', 'email': f'user{n}@bench.local'} for n in range(start, stop)
+        ])
+        db.session.commit()
+    return max(existing, rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--samples', type=int, default=50)
+    parser.add_argument('--fields', help='e.g. id,email')
+    parser.add_argument('--full', action='store_true', help='also time User.query.all() + to_dict()')
+    parser.add_argument('--database-uri', help='defaults to a throwaway SQLite file')
+    args = parser.parse_args()
+
+    app = make_app(user_bp, database_uri=args.database_uri)
+    with app.app_context():
+        started = time.perf_counter()
+        total = seed(args.rows)
+        print(f"🔍 {total} users ready in {time.perf_counter() - started:.1f}s")
+        max_id = db.session.query(func.max(User.id)).scalar()
+
+    client = app.test_client()
+    params = {'limit': args.limit}
+    if args.fields:
+        params['fields'] = args.fields
+
+    for label, after_id in (('first page', 0), ('middle page', max_id // 2), ('last page', max_id - args.limit)):
+        durations = []
+        for _ in range(args.samples):
+            started = time.perf_counter()
+            response = client.get('/api/users', query_string=dict(params, after_id=after_id))
+            durations.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.get_data(as_text=True)
+        summarize(f"{label} (after_id={after_id})", durations)
+
+    if args.full:
+        with app.app_context():
+            started = time.perf_counter()
+            users = [user.to_dict() for user in User.query.all()]
+            summarize(f"unpaginated ({len(users)} rows)", [time.perf_counter() - started])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the SendGrid, HubSpot and Stripe endpoints this app calls.
+
+Run it and point the app at it through the base-URL settings in src/config.py:
+
+    python src/tools/provider_standin.py --port 12111 --latency-ms 40
+
+    SENDGRID_API_BASE=http://127.0.0.1:12111 \
+    HUBSPOT_API_BASE=http://127.0.0.1:12111 \
+    STRIPE_API_BASE=http://127.0.0.1:12111 \
+    STRIPE_SECRET_KEY=sk_test_standin SENDGRID_API_KEY=standin \
+    HUBSPOT_API_KEY=standin HUBSPOT_PORTAL_ID=1 python src/main.py
+
+Every endpoint has its own latency, jitter, error rate and 429 behaviour. Set
+defaults on the command line, override per endpoint with --config (a JSON file
+of {"endpoint.name": {...}}), or change them at runtime through
+POST /_standin/config. GET /_standin/stats returns per-endpoint call counts.
+"""
+import argparse
+import itertools
+import json
+import random
+import secrets
+import threading
+import time
+from collections import defaultdict
+
+from flask import Flask, jsonify, request
+
+app = Flask(__name__)
+
+BEHAVIOR_FIELDS = ('latency_ms', 'jitter_ms', 'error_rate', 'rate_limit_rate', 'max_rps', 'retry_after')
+
+DEFAULT_BEHAVIOR = {
+    'latency_ms': 0.0,       # fixed delay added to every call
+    'jitter_ms': 0.0,        # uniform extra delay in [0, jitter_ms]
+    'error_rate': 0.0,       # probability of answering with a 500
+    'rate_limit_rate': 0.0,  # probability of answering with a 429
+    'max_rps': 0,            # hard per-endpoint requests/second cap, 0 disables
+    'retry_after': 1,        # Retry-After seconds sent with 429 responses
+}
+
+_config_lock = threading.Lock()
+_defaults = dict(DEFAULT_BEHAVIOR)
+_overrides = {}
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {'calls': 0, 'errors': 0, 'rate_limited': 0})
+_rps_windows = {}
+
+_state_lock = threading.Lock()
+_counter = itertools.count(1)
+_state = {}
+_idempotency = {}
+
+
+def reset_state():
+    """Drop every stored object, stat and idempotency record"""
+    global _counter
+    with _state_lock:
+        _counter = itertools.count(1)
+        _state.clear()
+        _state.update({
+            'hubspot_contacts': {},
+            'hubspot_deals': {},
+            'sendgrid_messages': 0,
+            'customers': {},
+            'prices': {},
+            'products': {},
+            'payment_intents': {},
+            'subscriptions': {},
+            'invoices': {},
+            'checkout_sessions': {},
+        })
+        _idempotency.clear()
+    with _stats_lock:
+        _stats.clear()
+        _rps_windows.clear()
+
+
+reset_state()
+
+
+def behavior_for(endpoint):
+    """Effective behaviour for an endpoint: defaults with any override applied"""
+    with _config_lock:
+        behavior = dict(_defaults)
+        behavior.update(_overrides.get(endpoint, {}))
+    return behavior
+
+
+def _over_rps_cap(endpoint, max_rps):
+    if not max_rps:
+        return False
+    second = int(time.time())
+    with _stats_lock:
+        window_second, count = _rps_windows.get(endpoint, (second, 0))
+        if window_second != second:
+            window_second, count = second, 0
+        count += 1
+        _rps_windows[endpoint] = (window_second, count)
+    return count > max_rps
+
+
+def simulate(endpoint, provider):
+    """Apply latency and return an error response if this call should fail"""
+    behavior = behavior_for(endpoint)
+    delay = behavior['latency_ms'] + random.uniform(0, behavior['jitter_ms'])
+    if delay > 0:
+        time.sleep(delay / 1000.0)
+
+    with _stats_lock:
+        _stats[endpoint]['calls'] += 1
+
+    if _over_rps_cap(endpoint, behavior['max_rps']) or random.random() < behavior['rate_limit_rate']:
+        with _stats_lock:
+            _stats[endpoint]['rate_limited'] += 1
+        response = _error_response(provider, 429, 'Too many requests')
+        response.headers['Retry-After'] = str(behavior['retry_after'])
+        return response
+
+    if random.random() < behavior['error_rate']:
+        with _stats_lock:
+            _stats[endpoint]['errors'] += 1
+        return _error_response(provider, 500, 'Simulated provider failure')
+
+    return None
+
+
+def _error_response(provider, status, message):
+    if provider == 'stripe':
+        error_type = 'rate_limit_error' if status == 429 else 'api_error'
+        body = {'error': {'type': error_type, 'message': message}}
+    elif provider == 'hubspot':
+        body = {'status': 'error', 'message': message, 'category': 'RATE_LIMITS' if status == 429 else 'INTERNAL_ERROR'}
+    else:
+        body = {'errors': [{'message': message, 'field': None, 'help': None}]}
+    response = jsonify(body)
+    response.status_code = status
+    return response
+
+
+def _new_id(prefix):
+    return f"{prefix}_{next(_counter):08d}{secrets.token_hex(4)}"
+
+
+# ---------------------------------------------------------------------------
+# Stand-in control endpoints
+# ---------------------------------------------------------------------------
+
+@app.route('/_standin/config', methods=['GET'])
+def get_config():
+    with _config_lock:
+        return jsonify({'defaults': _defaults, 'overrides': _overrides})
+
+
+@app.route('/_standin/config', methods=['POST'])
+def set_config():
+    data = request.get_json() or {}
+    with _config_lock:
+        _defaults.update({k: v for k, v in data.get('defaults', {}).items() if k in BEHAVIOR_FIELDS})
+        for endpoint, values in data.get('overrides', {}).items():
+            _overrides.setdefault(endpoint, {}).update({k: v for k, v in values.items() if k in BEHAVIOR_FIELDS})
+        return jsonify({'defaults': _defaults, 'overrides': _overrides})
+
+
+@app.route('/_standin/stats', methods=['GET'])
+def get_stats():
+    with _stats_lock:
+        stats = {endpoint: dict(values) for endpoint, values in _stats.items()}
+    with _state_lock:
+        objects = {name: len(value) if isinstance(value, dict) else value for name, value in _state.items()}
+    return jsonify({'endpoints': stats, 'objects': objects})
+
+
+@app.route('/_standin/reset', methods=['POST'])
+def reset():
+    reset_state()
+    return jsonify({'status': 'reset'})
+
+
+# ---------------------------------------------------------------------------
+# SendGrid
+# ---------------------------------------------------------------------------
+
+@app.route('/v3/mail/send', methods=['POST'])
+def sendgrid_mail_send():
+    failure = simulate('sendgrid.mail_send', 'sendgrid')
+    if failure is not None:
+        return failure
+    data = request.get_json(silent=True) or {}
+    if not data.get('personalizations') or not data.get('from'):
+        return _error_response('sendgrid', 400, 'personalizations and from are required')
+    with _state_lock:
+        _state['sendgrid_messages'] += 1
+    return '', 202
+
+
+# ---------------------------------------------------------------------------
+# HubSpot
+# ---------------------------------------------------------------------------
+
+def _hubspot_object(object_id, properties):
+    now = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+    return {'id': object_id, 'properties': properties, 'createdAt': now, 'updatedAt': now, 'archived': False}
+
+
+@app.route('/crm/v3/objects/contacts', methods=['POST'])
+def hubspot_create_contact():
+    failure = simulate('hubspot.contacts.create', 'hubspot')
+    if failure is not None:
+        return failure
+    properties = (request.get_json(silent=True) or {}).get('properties', {})
+    email = (properties.get('email') or '').lower()
+    with _state_lock:
+        contacts = _state['hubspot_contacts']
+        if email and email in contacts:
+            existing = contacts[email]
+            body = {
+                'status': 'error',
+                'message': f"Contact already exists. Existing ID: {existing['id']}",
+                'category': 'CONFLICT',
+            }
+            return jsonify(body), 409
+        contact = _hubspot_object(str(next(_counter)), properties)
+        contacts[email or contact['id']] = contact
+    return jsonify(contact), 201
+
+
+@app.route('/crm/v3/objects/contacts/<contact_id>', methods=['PATCH'])
+def hubspot_update_contact(contact_id):
+    failure = simulate('hubspot.contacts.update', 'hubspot')
+    if failure is not None:
+        return failure
+    properties = (request.get_json(silent=True) or {}).get('properties', {})
+    with _state_lock:
+        contacts = _state['hubspot_contacts']
+        if request.args.get('idProperty') == 'email':
+            contact = contacts.get(contact_id.lower())
+        else:
+            contact = next((c for c in contacts.values() if c['id'] == contact_id), None)
+        if contact is None:
+            return jsonify({'status': 'error', 'message': 'resource not found', 'category': 'OBJECT_NOT_FOUND'}), 404
+        contact['properties'].update(properties)
+        contact['updatedAt'] = time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+    return jsonify(contact), 200
+
+
+@app.route('/crm/v3/objects/deals', methods=['POST'])
+def hubspot_create_deal():
+    failure = simulate('hubspot.deals.create', 'hubspot')
+    if failure is not None:
+        return failure
+    properties = (request.get_json(silent=True) or {}).get('properties', {})
+    deal = _hubspot_object(str(next(_counter)), properties)
+    with _state_lock:
+        _state['hubspot_deals'][deal['id']] = deal
+    return jsonify(deal), 201
+
+
+# ---------------------------------------------------------------------------
+# Stripe
+# ---------------------------------------------------------------------------
+
+def parse_stripe_form(form):
+    """Turn Stripe's bracketed form encoding (metadata[plan], items[0][price]) into nested data"""
+    root = {}
+    for raw_key, value in form.items(multi=True):
+        parts = raw_key.replace(']', '').split('[')
+        node = root
+        for index, part in enumerate(parts):
+            last = index == len(parts) - 1
+            next_is_list = not last and parts[index + 1].isdigit()
+            if isinstance(node, list):
+                position = int(part)
+                while len(node) <= position:
+                    node.append(None)
+                if last:
+                    node[position] = value
+                else:
+                    if node[position] is None:
+                        node[position] = [] if next_is_list else {}
+                    node = node[position]
+            elif last:
+                node[part] = value
+            else:
+                node = node.setdefault(part, [] if next_is_list else {})
+    return root
+
+
+def _stripe_params():
+    if request.method == 'GET':
+        return parse_stripe_form(request.args)
+    return parse_stripe_form(request.form)
+
+
+def _stripe_create(endpoint, build):
+    """Run a Stripe create call, replaying the stored response for a reused Idempotency-Key"""
+    failure = simulate(endpoint, 'stripe')
+    if failure is not None:
+        return failure
+    key = request.headers.get('Idempotency-Key')
+    if key:
+        with _state_lock:
+            replay = _idempotency.get((endpoint, key))
+        if replay is not None:
+            response = jsonify(replay)
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+    params = _stripe_params()
+    with _state_lock:
+        obj = build(params)
+        if key:
+            _idempotency[(endpoint, key)] = obj
+    return jsonify(obj)
+
+
+def _stripe_retrieve(endpoint, collection, object_id):
+    failure = simulate(endpoint, 'stripe')
+    if failure is not None:
+        return failure
+    with _state_lock:
+        obj = _state[collection].get(object_id)
+    if obj is None:
+        body = {'error': {'type': 'invalid_request_error', 'code': 'resource_missing',
+                          'message': f"No such object: '{object_id}'"}}
+        return jsonify(body), 404
+    return jsonify(obj)
+
+
+def _stripe_list(endpoint, collection, url, predicate=None):
+    failure = simulate(endpoint, 'stripe')
+    if failure is not None:
+        return failure
+    params = _stripe_params()
+    limit = max(1, min(int(params.get('limit', 10)), 100))
+    starting_after = params.get('starting_after')
+    with _state_lock:
+        objects = list(_state[collection].values())
+    if predicate is not None:
+        objects = [obj for obj in objects if predicate(obj, params)]
+    if starting_after:
+        ids = [obj['id'] for obj in objects]
+        objects = objects[ids.index(starting_after) + 1:] if starting_after in ids else []
+    page = objects[:limit]
+    return jsonify({'object': 'list', 'url': url, 'has_more': len(objects) > limit, 'data': page})
+
+
+def _metadata(params):
+    return params.get('metadata') or {}
+
+
+@app.route('/v1/customers', methods=['POST'])
+def stripe_create_customer():
+    def build(params):
+        customer = {
+            'id': _new_id('cus'),
+            'object': 'customer',
+            'created': int(time.time()),
+            'email': params.get('email'),
+            'name': params.get('name'),
+            'metadata': _metadata(params),
+            'livemode': False,
+        }
+        _state['customers'][customer['id']] = customer
+        return customer
+    return _stripe_create('stripe.customers.create', build)
+
+
+@app.route('/v1/customers', methods=['GET'])
+def stripe_list_customers():
+    def matches(customer, params):
+        return 'email' not in params or customer['email'] == params['email']
+    return _stripe_list('stripe.customers.list', 'customers', '/v1/customers', matches)
+
+
+@app.route('/v1/customers/<customer_id>', methods=['GET'])
+def stripe_retrieve_customer(customer_id):
+    return _stripe_retrieve('stripe.customers.retrieve', 'customers', customer_id)
+
+
+@app.route('/v1/prices', methods=['POST'])
+def stripe_create_price():
+    def build(params):
+        product_id = params.get('product')
+        if product_id is None:
+            product_data = params.get('product_data') or {}
+            product_id = _new_id('prod')
+            _state['products'][product_id] = {
+                'id': product_id,
+                'object': 'product',
+                'name': product_data.get('name'),
+                'description': product_data.get('description'),
+            }
+        lookup_key = params.get('lookup_key')
+        if lookup_key and str(params.get('transfer_lookup_key')).lower() == 'true':
+            for existing in _state['prices'].values():
+                if existing['lookup_key'] == lookup_key:
+                    existing['lookup_key'] = None
+        price = {
+            'id': _new_id('price'),
+            'object': 'price',
+            'active': True,
+            'created': int(time.time()),
+            'currency': params.get('currency', 'usd'),
+            'unit_amount': int(params.get('unit_amount', 0)),
+            'recurring': params.get('recurring'),
+            'type': 'recurring' if params.get('recurring') else 'one_time',
+            'lookup_key': lookup_key,
+            'product': product_id,
+            'metadata': _metadata(params),
+        }
+        _state['prices'][price['id']] = price
+        return price
+    return _stripe_create('stripe.prices.create', build)
+
+
+@app.route('/v1/prices', methods=['GET'])
+def stripe_list_prices():
+    def matches(price, params):
+        lookup_keys = params.get('lookup_keys')
+        if lookup_keys is not None and price['lookup_key'] not in lookup_keys:
+            return False
+        if 'active' in params and str(price['active']).lower() != str(params['active']).lower():
+            return False
+        return True
+    return _stripe_list('stripe.prices.list', 'prices', '/v1/prices', matches)
+
+
+@app.route('/v1/payment_intents', methods=['POST'])
+def stripe_create_payment_intent():
+    def build(params):
+        intent_id = _new_id('pi')
+        intent = {
+            'id': intent_id,
+            'object': 'payment_intent',
+            'amount': int(params.get('amount', 0)),
+            'currency': params.get('currency', 'usd'),
+            'customer': params.get('customer'),
+            'description': params.get('description'),
+            'metadata': _metadata(params),
+            'status': 'requires_payment_method',
+            'client_secret': f"{intent_id}_secret_{secrets.token_hex(8)}",
+            'created': int(time.time()),
+            'livemode': False,
+        }
+        _state['payment_intents'][intent_id] = intent
+        return intent
+    return _stripe_create('stripe.payment_intents.create', build)
+
+
+@app.route('/v1/payment_intents', methods=['GET'])
+def stripe_list_payment_intents():
+    return _stripe_list('stripe.payment_intents.list', 'payment_intents', '/v1/payment_intents')
+
+
+@app.route('/v1/payment_intents/<intent_id>', methods=['GET'])
+def stripe_retrieve_payment_intent(intent_id):
+    return _stripe_retrieve('stripe.payment_intents.retrieve', 'payment_intents', intent_id)
+
+
+@app.route('/_standin/stripe/payment_intents/<intent_id>/succeed', methods=['POST'])
+def stripe_succeed_payment_intent(intent_id):
+    """Test helper: mark a payment intent as paid, as if the card had been confirmed"""
+    with _state_lock:
+        intent = _state['payment_intents'].get(intent_id)
+        if intent is None:
+            return jsonify({'error': 'not found'}), 404
+        intent['status'] = 'succeeded'
+    return jsonify(intent)
+
+
+@app.route('/v1/subscriptions', methods=['POST'])
+def stripe_create_subscription():
+    def build(params):
+        now = int(time.time())
+        trial_end = int(params['trial_end']) if params.get('trial_end') else None
+        subscription_id = _new_id('sub')
+        items = []
+        for item in params.get('items') or []:
+            price = _state['prices'].get(item.get('price'))
+            items.append({'id': _new_id('si'), 'object': 'subscription_item', 'price': price, 'quantity': 1})
+        subscription = {
+            'id': subscription_id,
+            'object': 'subscription',
+            'customer': params.get('customer'),
+            'status': 'trialing' if trial_end else 'active',
+            'trial_end': trial_end,
+            'current_period_start': now,
+            'current_period_end': trial_end or now + 30 * 24 * 60 * 60,
+            'cancel_at_period_end': False,
+            'items': {'object': 'list', 'data': items, 'has_more': False,
+                      'url': f"/v1/subscription_items?subscription={subscription_id}"},
+            'metadata': _metadata(params),
+            'created': now,
+        }
+        _state['subscriptions'][subscription_id] = subscription
+        invoice = {
+            'id': _new_id('in'),
+            'object': 'invoice',
+            'customer': subscription['customer'],
+            'subscription': subscription_id,
+            'status': 'paid',
+            'amount_due': 0,
+            'amount_paid': 0,
+            'currency': 'usd',
+            'created': now,
+        }
+        _state['invoices'][invoice['id']] = invoice
+        return subscription
+    return _stripe_create('stripe.subscriptions.create', build)
+
+
+@app.route('/v1/subscriptions', methods=['GET'])
+def stripe_list_subscriptions():
+    return _stripe_list('stripe.subscriptions.list', 'subscriptions', '/v1/subscriptions')
+
+
+@app.route('/v1/subscriptions/<subscription_id>', methods=['DELETE'])
+def stripe_cancel_subscription(subscription_id):
+    failure = simulate('stripe.subscriptions.cancel', 'stripe')
+    if failure is not None:
+        return failure
+    with _state_lock:
+        subscription = _state['subscriptions'].get(subscription_id)
+        if subscription is None:
+            body = {'error': {'type': 'invalid_request_error', 'code': 'resource_missing',
+                              'message': f"No such subscription: '{subscription_id}'"}}
+            return jsonify(body), 404
+        subscription['status'] = 'canceled'
+        subscription['canceled_at'] = int(time.time())
+    return jsonify(subscription)
+
+
+@app.route('/v1/invoices', methods=['GET'])
+def stripe_list_invoices():
+    return _stripe_list('stripe.invoices.list', 'invoices', '/v1/invoices')
+
+
+@app.route('/v1/checkout/sessions', methods=['POST'])
+def stripe_create_checkout_session():
+    def build(params):
+        session_id = _new_id('cs_test')
+        amount_total = 0
+        for item in params.get('line_items') or []:
+            unit_amount = (item.get('price_data') or {}).get('unit_amount')
+            if unit_amount is None and item.get('price') in _state['prices']:
+                unit_amount = _state['prices'][item['price']]['unit_amount']
+            amount_total += int(unit_amount or 0) * int(item.get('quantity', 1))
+        session = {
+            'id': session_id,
+            'object': 'checkout.session',
+            'customer': params.get('customer'),
+            'mode': params.get('mode'),
+            'ui_mode': params.get('ui_mode', 'hosted'),
+            'status': 'open',
+            'amount_total': amount_total,
+            'currency': 'usd',
+            'client_secret': f"{session_id}_secret_{secrets.token_hex(8)}",
+            'expires_at': int(time.time()) + 24 * 60 * 60,
+            'return_url': params.get('return_url'),
+            'metadata': _metadata(params),
+            'created': int(time.time()),
+        }
+        _state['checkout_sessions'][session_id] = session
+        return session
+    return _stripe_create('stripe.checkout.sessions.create', build)
+
+
+@app.route('/v1/checkout/sessions/<session_id>', methods=['GET'])
+def stripe_retrieve_checkout_session(session_id):
+    return _stripe_retrieve('stripe.checkout.sessions.retrieve', 'checkout_sessions', session_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local SendGrid/HubSpot/Stripe stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=12111)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--max-rps', type=int, default=0)
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--config', help='JSON file of per-endpoint overrides')
+    args = parser.parse_args()
+
+    _defaults.update({
+        'latency_ms': args.latency_ms,
+        'jitter_ms': args.jitter_ms,
+        'error_rate': args.error_rate,
+        'rate_limit_rate': args.rate_limit_rate,
+        'max_rps': args.max_rps,
+        'retry_after': args.retry_after,
+    })
+    if args.config:
+        with open(args.config) as f:
+            for endpoint, values in json.load(f).items():
+                _overrides[endpoint] = {k: v for k, v in values.items() if k in BEHAVIOR_FIELDS}
+
+    print(f"🔍 Provider stand-in listening on http://{args.host}:{args.port}")
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
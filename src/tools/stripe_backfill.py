@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Backfill the local Stripe mirror tables from Stripe's list endpoints.
+
+    STRIPE_SECRET_KEY=sk_live_... python src/tools/stripe_backfill.py
+    python src/tools/stripe_backfill.py --only customers,invoices --created-after 2025-01-01
+
+Lists are streamed with auto-pagination and committed in batches, so memory
+stays flat however many objects the account has. Rows already updated by a
+newer webhook are left alone.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import stripe
+from flask import Flask
+from src.config import STRIPE_API_BASE
+from src.database import engine
+from src.models.user import db
+from src.services import stripe_client, stripe_mirror
+
+RESOURCES = {
+    'customers': stripe.Customer,
+    'subscriptions': stripe.Subscription,
+    'payment_intents': stripe.PaymentIntent,
+    'invoices': stripe.Invoice,
+}
+
+
+def make_app():
+    """
+    Just the database and the Stripe client. Importing src.main would also start the
+    webhook workers (processing pending production events and sending emails) and
+    the other background services, none of which a one-off backfill should run.
+    """
+    stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+    stripe.api_base = STRIPE_API_BASE
+    stripe_client.configure()
+
+    app = Flask(__name__)
+    engine.configure(app)
+    with app.app_context():
+        engine.ensure_schema()
+    return app
+
+
+def backfill(name, resource, created_after, batch_size):
+    params = {'limit': 100}
+    if created_after:
+        params['created'] = {'gte': created_after}
+    if name == 'subscriptions':
+        params['status'] = 'all'  # canceled subscriptions are excluded by default
+
+    started = time.perf_counter()
+    synced_at = int(time.time())
+    count = 0
+    for obj in resource.list(**params).auto_paging_iter():
+        stripe_mirror.upsert(obj, synced_at, commit=False)
+        count += 1
+        if count % batch_size == 0:
+            db.session.commit()
+            print(f"🔍 {name}: {count} synced")
+    db.session.commit()
+    print(f"✅ {name}: {count} synced in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill the local Stripe mirror tables')
+    parser.add_argument('--only', help=f"comma-separated subset of: {', '.join(RESOURCES)}")
+    parser.add_argument('--created-after', help='only objects created on or after this date (YYYY-MM-DD)')
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    names = args.only.split(',') if args.only else list(RESOURCES)
+    unknown = [name for name in names if name not in RESOURCES]
+    if unknown:
+        parser.error(f"unknown resources: {', '.join(unknown)}")
+    created_after = int(datetime.strptime(args.created_after, '%Y-%m-%d').timestamp()) if args.created_after else None
+
+    app = make_app()
+    with app.app_context():
+        for name in names:
+            backfill(name, RESOURCES[name], created_after, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import insert
+
+from src.models.user import User, db
+from src.routes.user import user_bp
+from src.tools.bench_support import make_app
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = make_app(user_bp, database_uri=f"sqlite:///{tmp_path / 'users.db'}")
+    with app.app_context():
+        db.session.execute(insert(User), [
+            {'username': f'user{i}', 'email': f'user{i}@example.com'} for i in range(250)
+        ])
+        db.session.commit()
+    return app.test_client()
+
+
+def fetch_all(client, limit=None):
+    """Walk /api/users the way the admin page does, following X-Next-After-Id"""
+    users, after_id, pages = [], 0, 0
+    while after_id is not None:
+        query = f'after_id={after_id}' + (f'&limit={limit}' if limit else '')
+        response = client.get(f'/api/users?{query}')
+        assert response.status_code == 200
+        users.extend(response.get_json())
+        after_id = response.headers.get('X-Next-After-Id')
+        pages += 1
+    return users, pages
+
+
+def test_default_page_is_limited(client):
+    response = client.get('/api/users')
+    assert len(response.get_json()) == 100
+    assert response.headers['X-Next-After-Id'] == '100'
+    assert 'rel="next"' in response.headers['Link']
+
+
+def test_following_pages_returns_every_user(client):
+    users, pages = fetch_all(client)
+    assert [user['id'] for user in users] == list(range(1, 251))
+    assert pages == 3
+
+
+def test_admin_page_limit_returns_every_user_in_one_page(client):
+    users, pages = fetch_all(client, limit=1000)
+    assert len(users) == 250
+    assert pages == 1